@@ -0,0 +1,185 @@
+### IMPORTS ###
+
+import argparse
+import multiprocessing
+import os
+import runpy
+import sys
+import time
+
+import nengo
+import numpy as np
+
+COMPONENTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, COMPONENTS_DIR)
+
+
+### CONSTANTS ###
+
+SEED = 0 # Seed of NumPy's global generator (used for the vocabularies) and of the simulator
+SYNAPSE = 0.03 # Synapse of all probes
+
+
+### HELPERS ###
+
+# Function for a node that outputs `value` between `start` and `end` (and 0 otherwise)
+def pulse(start, end, value=1.0):
+    return lambda t: value if start <= t < end else 0.0
+
+# Similarity between the last probed value and a pointer of the vocabulary
+def final_similarity(sim, probe, vocab, key):
+    return np.dot(sim.data[probe][-1], vocab[key].v)
+
+# Result of a single check: (description, measured value, passed)
+def check_above(description, value, threshold):
+    return ("%s > %.2f" % (description, threshold), value, value > threshold)
+
+def check_below(description, value, threshold):
+    return ("%s < %.2f" % (description, threshold), value, value < threshold)
+
+
+### SCENARIOS ###
+
+# Every scenario gets the namespace of a freshly executed component file, drives
+# its inputs, adds probes and returns a function that checks the simulator data.
+
+def cleanup_green_latches(ns):
+    model, vocab = ns["model"], ns["bool_vocab"]
+
+    # Briefly provide "TRUE" to the green memory only
+    ns["green_input"].output = pulse(0.3, 0.4)
+    with model:
+        green = nengo.Probe(model.green_memory.output, synapse=SYNAPSE)
+        red = nengo.Probe(model.red_memory.output, synapse=SYNAPSE)
+        comparison = nengo.Probe(model.comparison.output, synapse=SYNAPSE)
+
+    def check(sim):
+        return [
+            check_above("green memory . TRUE", final_similarity(sim, green, vocab, "TRUE"), 0.5),
+            check_above("red memory . FALSE", final_similarity(sim, red, vocab, "FALSE"), 0.5),
+            check_above("comparison with TRUE*FALSE", sim.data[comparison][-1, 0], 0.5),
+        ]
+    return check
+
+def cleanup_stays_false(ns):
+    model, vocab = ns["model"], ns["bool_vocab"]
+    with model:
+        green = nengo.Probe(model.green_memory.output, synapse=SYNAPSE)
+        red = nengo.Probe(model.red_memory.output, synapse=SYNAPSE)
+
+    def check(sim):
+        return [
+            check_above("green memory . FALSE", final_similarity(sim, green, vocab, "FALSE"), 0.5),
+            check_above("red memory . FALSE", final_similarity(sim, red, vocab, "FALSE"), 0.5),
+        ]
+    return check
+
+# Scenario for circular_conv.py in which the first `n_true` memories are set to "TRUE" and the others to "FALSE"
+def circular_conv_with(n_true):
+    def setup(ns):
+        model, vocab = ns["model"], ns["bool_vocab"]
+        memories = [model.green_memory, model.red_memory, model.blue_memory,
+                    model.magenta_memory, model.yellow_memory]
+        with model:
+            for i, memory in enumerate(memories):
+                pointer = vocab["TRUE" if i < n_true else "FALSE"].v
+                initial = nengo.Node(lambda t, v=pointer: v if t < 0.1 else 0 * v)
+                nengo.Connection(initial, memory.input)
+            done = nengo.Probe(ns["done"], synapse=SYNAPSE)
+
+        # The memories have no cleanup and decay after the input, so check the peak of "done"
+        def check(sim):
+            value = np.max(sim.data[done][:, 0])
+            if n_true == ns["COLORS_TO_FIND"]:
+                return [check_above("peak of done", value, 0.5)]
+            return [check_below("peak of done", value, 0.5)]
+        return check
+    return setup
+
+# Scenario for movement.py with the done slider set to `done`
+def movement_with(done):
+    def setup(ns):
+        body = ns["body"]
+        ns["done_slider"].output = done
+        with ns["model"]:
+            pose = nengo.Node(lambda t: [body.x, body.y])
+            pose_probe = nengo.Probe(pose)
+
+        def check(sim):
+            # Distance traveled in the second half of the run
+            xy = sim.data[pose_probe][len(sim.trange()) // 2:]
+            traveled = np.sum(np.linalg.norm(np.diff(xy, axis=0), axis=1))
+            if done:
+                return [check_below("distance traveled", traveled, 0.05)]
+            return [check_above("distance traveled", traveled, 0.5)]
+        return check
+    return setup
+
+# Name: (component file, setup function, simulated time)
+SCENARIOS = {
+    "cleanup_memory/green_latches": ("cleanup_memory.py", cleanup_green_latches, 1.0),
+    "cleanup_memory/stays_false":   ("cleanup_memory.py", cleanup_stays_false, 1.0),
+    "circular_conv/done":           ("circular_conv.py", circular_conv_with(2), 0.5),
+    "circular_conv/not_done":       ("circular_conv.py", circular_conv_with(1), 0.5),
+    "movement/moving":              ("movement.py", movement_with(0), 2.0),
+    "movement/stopped":             ("movement.py", movement_with(1), 2.0),
+}
+
+
+### RUNNING SCENARIOS ###
+
+def run_scenario(name):
+    """Builds and runs a single scenario; returns its timings and check results."""
+    filename, setup, sim_time = SCENARIOS[name]
+    result = {"name": name, "build_time": None, "speed": None, "checks": [], "error": None}
+    try:
+        start = time.time()
+        # The component files build their vocabularies with the global NumPy generator
+        np.random.seed(SEED)
+        ns = runpy.run_path(os.path.join(COMPONENTS_DIR, filename))
+        check = setup(ns)
+        with nengo.Simulator(ns["model"], seed=SEED, progress_bar=False) as sim:
+            result["build_time"] = time.time() - start
+            start = time.time()
+            sim.run(sim_time, progress_bar=False)
+            result["speed"] = sim_time / (time.time() - start)
+        result["checks"] = check(sim)
+    except Exception as e:
+        result["error"] = "%s: %s" % (type(e).__name__, e)
+    result["passed"] = result["error"] is None and all(passed for _, _, passed in result["checks"])
+    return result
+
+def report(results):
+    print("%-30s %10s %10s  %s" % ("scenario", "build [s]", "sim/wall", "result"))
+    for result in sorted(results, key=lambda r: r["name"]):
+        print("%-30s %10s %10s  %s" % (
+            result["name"],
+            "-" if result["build_time"] is None else "%.2f" % result["build_time"],
+            "-" if result["speed"] is None else "%.3f" % result["speed"],
+            "PASS" if result["passed"] else "FAIL"))
+        if result["error"] is not None:
+            print("    error: %s" % result["error"])
+        for description, value, passed in result["checks"]:
+            if not passed:
+                print("    failed: %s (got %.3f)" % (description, value))
+
+
+### MAIN ###
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the Components models headlessly.")
+    parser.add_argument("scenarios", nargs="*", default=sorted(SCENARIOS),
+                        help="scenarios to run (default: all)")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="number of worker processes (default: one per CPU)")
+    args = parser.parse_args()
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error("unknown scenarios: %s (choose from %s)"
+                     % (", ".join(unknown), ", ".join(sorted(SCENARIOS))))
+
+    pool = multiprocessing.Pool(args.processes)
+    results = pool.map(run_scenario, args.scenarios)
+    pool.close()
+    report(results)
+    sys.exit(0 if all(result["passed"] for result in results) else 1)
@@ -0,0 +1,221 @@
+### IMPORTS ###
+
+import grid
+import numpy as np
+
+from colour_critter import (Cell, MAP, RADAR_ANGLES, RADAR_RANGE, MAX_SPEED, MAX_ROTATE, MAX_STEP,
+                            DEFAULT_CONFIG, actuate, radar_readings)
+from lidar import map_arrays, direction_steps
+
+
+### CONSTANTS ###
+
+MIN_DELTA = 1.0 / 64 # Finest step of the radar (as in ContinuousAgent.detect)
+
+
+### BATCHED WORLDS ###
+
+class BatchWorld(object):
+    """Independent copies of the critter's world, stepped together without a Nengo model.
+
+    `maps` is either a single map shared by all `n_worlds` copies (the fast
+    path: one wall mask and one color array for all of them) or a list with
+    one map per copy (all of the same size). Every copy holds one agent,
+    whose pose is kept in the arrays `x`, `y`, `dir`, `cell_x` and `cell_y`.
+
+    `step` moves all agents with the kinematics of `actuate` and
+    `ContinuousAgent.go_in_direction` (sub-steps of at most MAX_STEP, the
+    closest of the current cell and its neighbours becomes the new cell, and
+    a move into a wall is refused), and returns the radar readings and the
+    color code of the cell of every agent. The radar follows the stepping and
+    stopping rule of `ContinuousAgent.detect`, so it gives the same readings
+    as `radar_readings`.
+    """
+
+    def __init__(self, maps=MAP, n_worlds=None, cell=Cell, directions=4):
+        shared = isinstance(maps, str)
+        if shared and n_worlds is None:
+            raise ValueError("n_worlds is required when all worlds share one map")
+        if not shared:
+            n_worlds = len(maps)
+
+        # A world per distinct map, only used to read walls, colors and geometry
+        worlds = {}
+        for m in ([maps] if shared else maps):
+            if m not in worlds:
+                worlds[m] = grid.World(cell, map=m, directions=directions)
+        self.world = worlds[maps if shared else maps[0]]
+        if any((w.width, w.height) != (self.world.width, self.world.height) for w in worlds.values()):
+            raise ValueError("All maps must have the same size")
+
+        if shared:
+            self.walls, self.colors = map_arrays(self.world)
+            self.index = None
+        else:
+            arrays = [map_arrays(worlds[m]) for m in maps]
+            self.walls = np.array([walls for walls, _ in arrays])
+            self.colors = np.array([colors for _, colors in arrays])
+            self.index = np.arange(n_worlds)
+
+        self.n_worlds = n_worlds
+        self.maps = [maps] * n_worlds if shared else list(maps)
+        self.directions = directions
+        self.hit_wall = np.zeros(n_worlds, dtype=bool)
+        self.reset()
+
+    def reset(self, positions=None, rng=np.random):
+        """Places every agent at its (x, y, dir) in `positions` (an n_worlds x 3 array).
+
+        By default all agents start at the start position of colour_critter.py;
+        with positions="random" they are placed on random free cells with random
+        directions (as World.add does).
+        """
+        if positions is None:
+            positions = np.tile(DEFAULT_CONFIG["start"], (self.n_worlds, 1))
+        elif isinstance(positions, str) and positions == "random":
+            positions = np.empty((self.n_worlds, 3))
+            for i in range(self.n_worlds):
+                free = np.argwhere(~(self.walls if self.index is None else self.walls[i]))
+                positions[i, 1], positions[i, 0] = free[rng.randint(len(free))]
+                positions[i, 2] = rng.randint(self.directions)
+        positions = np.asarray(positions, dtype=float)
+        self.cell_x = positions[:, 0].astype(int)
+        self.cell_y = positions[:, 1].astype(int)
+        self.x = positions[:, 0].copy()
+        self.y = positions[:, 1].copy()
+        self.dir = positions[:, 2] % self.directions
+        self.hit_wall[:] = False
+        return self.observe()
+
+    # Position after moving `distance` in `directions` from (x, y) in the given cells, as go_in_direction:
+    # the closest of the cell and its neighbours becomes the new cell; returns it and whether it is a wall
+    def try_move(self, x, y, cell_x, cell_y, directions, distance, maps):
+        offsets = direction_steps(self.world, cell_y, directions)
+        x = x + distance * offsets[:, 0]
+        y = y + distance * offsets[:, 1]
+
+        # Closest of the current cell and its neighbours (the current cell wins ties)
+        neighbours_x, neighbours_y = self.world.get_neighbour_points(cell_x, cell_y)
+        candidates_x = np.column_stack([cell_x, neighbours_x])
+        candidates_y = np.column_stack([cell_y, neighbours_y])
+        closest = np.argmin((x[:, None] - candidates_x)**2 + (y[:, None] - candidates_y)**2, axis=1)
+        rows = np.arange(len(closest))
+        new_x, new_y = candidates_x[rows, closest], candidates_y[rows, closest]
+        blocked = (closest > 0) & self.walls[maps + (new_y, new_x)]
+        return x, y, new_x, new_y, blocked
+
+    # Moves the agents selected by `active` by `distance` in their current directions
+    def go_forward(self, active, distance):
+        maps = () if self.index is None else (self.index[active],)
+        x, y, new_x, new_y, blocked = self.try_move(
+            self.x[active], self.y[active], self.cell_x[active], self.cell_y[active],
+            self.dir[active], distance, maps)
+
+        # Moves into a wall are refused
+        moved = np.flatnonzero(active)[~blocked]
+        self.cell_x[moved], self.cell_y[moved] = new_x[~blocked], new_y[~blocked]
+        self.x[moved], self.y[moved] = x[~blocked], y[~blocked]
+        self.hit_wall[np.flatnonzero(active)[blocked]] = True
+
+    def step(self, actions, dt=0.001):
+        """Applies an n_worlds x 2 array of (speed, rotation) commands for `dt` seconds.
+
+        Returns the radar readings (n_worlds x 3) and the color codes of the
+        cells of all agents. `hit_wall` records which agents ran into a wall.
+        """
+        actions = np.asarray(actions, dtype=float).reshape(self.n_worlds, 2)
+        distance = actions[:, 0] * dt * MAX_SPEED
+        rotation = actions[:, 1] * dt * MAX_ROTATE
+        steps = np.maximum(1, np.ceil(np.abs(distance) / MAX_STEP)).astype(int)
+        self.hit_wall[:] = False
+        for k in range(steps.max()):
+            active = steps > k
+            self.dir[active] = (self.dir[active] + rotation[active] / steps[active]) % self.directions
+            self.go_forward(active, distance[active] / steps[active])
+        return self.observe()
+
+    def observe(self):
+        """Returns the radar readings (n_worlds x 3) and the color codes of the cells of all agents."""
+        maps = () if self.index is None else (self.index,)
+        return self.radar(), self.colors[maps + (self.cell_y, self.cell_x)]
+
+    def radar(self):
+        """Returns the wall distances of the detectors of all agents (left, forward, right).
+
+        All rays are stepped together with the rule of ContinuousAgent.detect:
+        steps of one cell, halved whenever a step would enter a wall, until a
+        step of MIN_DELTA would, or until RADAR_RANGE is covered.
+        """
+        n_rays = len(RADAR_ANGLES)
+        directions = ((self.dir[:, None] + RADAR_ANGLES) % self.directions).ravel()
+        start_x, start_y = np.repeat(self.x, n_rays), np.repeat(self.y, n_rays)
+        x, y = start_x.copy(), start_y.copy()
+        cell_x, cell_y = np.repeat(self.cell_x, n_rays), np.repeat(self.cell_y, n_rays)
+        index = None if self.index is None else np.repeat(self.index, n_rays)
+        distance = np.zeros(len(directions))
+        delta = np.ones(len(directions))
+        done = np.zeros(len(directions), dtype=bool)
+
+        active = np.flatnonzero(distance < RADAR_RANGE)
+        while len(active) > 0:
+            maps = () if index is None else (index[active],)
+            new_x, new_y, new_cell_x, new_cell_y, blocked = self.try_move(
+                x[active], y[active], cell_x[active], cell_y[active], directions[active],
+                delta[active], maps)
+
+            # Free steps move the ray on
+            free = active[~blocked]
+            x[free], y[free] = new_x[~blocked], new_y[~blocked]
+            cell_x[free], cell_y[free] = new_cell_x[~blocked], new_cell_y[~blocked]
+            distance[free] += delta[free]
+
+            # Blocked steps are halved, down to MIN_DELTA, where the ray stops
+            hit = active[blocked]
+            stop = hit[delta[hit] <= MIN_DELTA]
+            delta[hit[delta[hit] > MIN_DELTA]] /= 2
+            distance[stop] = np.sqrt((start_x[stop] - x[stop])**2 + (start_y[stop] - y[stop])**2)
+            done[stop] = True
+
+            active = active[~done[active] & (distance[active] < RADAR_RANGE)]
+        return distance.reshape(self.n_worlds, n_rays)
+
+
+### CHECK ###
+
+def compare_with_agents(batch, n_steps=200, seed=0):
+    """Steps `batch` with random commands and compares it with one ContinuousAgent per world.
+
+    Every agent is put on the start pose of its world, moved with `actuate`
+    and read with `radar_readings`. Returns the largest pose
+    and radar differences and the number of color mismatches.
+    """
+    rng = np.random.RandomState(seed)
+    bodies = []
+    for i in range(batch.n_worlds):
+        world = grid.World(batch.world.Cell, map=batch.maps[i], directions=batch.directions)
+        body = grid.ContinuousAgent()
+        world.add(body, x=int(batch.cell_x[i]), y=int(batch.cell_y[i]), dir=batch.dir[i])
+        body.x, body.y = batch.x[i], batch.y[i]
+        bodies.append(body)
+
+    pose_error = radar_error = 0.
+    color_errors = 0
+    for _ in range(n_steps):
+        actions = np.column_stack([rng.uniform(-0.2, 1, batch.n_worlds),
+                                   rng.uniform(-1, 1, batch.n_worlds)])
+        radar, codes = batch.step(actions)
+        for i, body in enumerate(bodies):
+            actuate(body, actions[i, 0], actions[i, 1])
+            pose_error = max(pose_error, abs(body.x - batch.x[i]), abs(body.y - batch.y[i]),
+                             abs(body.dir - batch.dir[i]))
+            radar_error = max(radar_error, np.max(np.abs(np.array(radar_readings(body)) - radar[i])))
+            color_errors += body.cell.cellcolor != codes[i]
+    return pose_error, radar_error, color_errors
+
+
+if __name__ == "__main__":
+    batch = BatchWorld(n_worlds=16)
+    batch.reset("random", rng=np.random.RandomState(0))
+    pose_error, radar_error, color_errors = compare_with_agents(batch)
+    print("Largest pose difference: %g, largest radar difference: %g, color mismatches: %d" % (
+        pose_error, radar_error, color_errors))
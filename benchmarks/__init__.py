@@ -0,0 +1 @@
+# Benchmarks for the critter model and its components (run as `python -m benchmarks.<name>`)
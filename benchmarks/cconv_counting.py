@@ -0,0 +1,172 @@
+### IMPORTS ###
+
+import argparse
+import itertools
+import multiprocessing
+import time
+
+import nengo
+import numpy as np
+import nengo.spa as spa
+import nengo.networks as networks
+
+from colour_critter import COLORS, COLORS_TO_FIND, STOP_SIM_THRESHOLD
+
+
+### CONSTANTS ###
+
+SEED = 0 # Seed for vocabulary, memory subsets and simulator
+TRIALS = 3 # Number of random sets of TRUE memories per count
+PRESENT_TIME = 0.3 # Time every set of memories is presented (in seconds)
+SETTLE_TIME = 0.2 # Time after a change of the memories before the comparison is measured (in seconds)
+
+
+### COUNTING NETWORK ###
+
+def build_counting(D, n_neurons, target, schedule, seed=SEED):
+    """Builds the color counting part of colour_critter.py, fed with exact memory pointers.
+
+    `schedule` is a list of masks (one boolean per color); every mask is
+    presented for PRESENT_TIME seconds, with TRUE for the colors in the mask
+    and FALSE for the others. The convolved memories are compared with
+    TRUE*TRUE*... (`target` times). Returns the model and a probe on the
+    output of the comparison.
+    """
+    rng = np.random.RandomState(seed)
+    vocab = spa.Vocabulary(D, unitary=True, rng=rng)
+    vocab.add("FALSE", [1.] + [0.]*(D-1))
+    vocab.parse("TRUE")
+    pointers = {True: vocab["TRUE"].v, False: vocab["FALSE"].v}
+
+    def memory_input(t):
+        mask = schedule[min(int(t / PRESENT_TIME), len(schedule) - 1)]
+        return np.concatenate([pointers[seen] for seen in mask])
+
+    with spa.SPA(seed=seed) as model:
+        memories = nengo.Node(memory_input)
+        green, red, blue, magenta, yellow = [memories[i*D:(i+1)*D] for i in range(len(COLORS))]
+
+        # Convolve all memories together (same structure as in colour_critter.py)
+        model.cconv_gr    = networks.CircularConvolution(n_neurons, D, label="G*R")
+        model.cconv_bm    = networks.CircularConvolution(n_neurons, D, label="B*M")
+        model.cconv_bmy   = networks.CircularConvolution(n_neurons, D, label="B*M*Y")
+        model.cconv_grbmy = networks.CircularConvolution(n_neurons, D, label="G*R*B*M*Y")
+        nengo.Connection(green, model.cconv_gr.A)
+        nengo.Connection(red, model.cconv_gr.B)
+        nengo.Connection(blue, model.cconv_bm.A)
+        nengo.Connection(magenta, model.cconv_bm.B)
+        nengo.Connection(model.cconv_bm.output, model.cconv_bmy.A)
+        nengo.Connection(yellow, model.cconv_bmy.B)
+        nengo.Connection(model.cconv_gr.output, model.cconv_grbmy.A)
+        nengo.Connection(model.cconv_bmy.output, model.cconv_grbmy.B)
+
+        # Compare with the target number of colors
+        model.target = spa.State(D, vocab=vocab)
+        model.target_input = spa.Input(target=("*TRUE"*target)[1:])
+        model.comparison = spa.Compare(D, vocab=vocab)
+        nengo.Connection(model.cconv_grbmy.output, model.comparison.inputA)
+        nengo.Connection(model.target.output, model.comparison.inputB)
+        probe = nengo.Probe(model.comparison.output, synapse=0.01)
+
+    return model, probe
+
+# Random memory masks: `trials` per number of TRUE memories (from 0 to all colors)
+def make_schedule(trials, seed=SEED):
+    rng = np.random.RandomState(seed)
+    schedule, counts = [], []
+    for k in range(len(COLORS) + 1):
+        for _ in range(trials):
+            seen = set(rng.choice(len(COLORS), k, replace=False).tolist())
+            schedule.append([i in seen for i in range(len(COLORS))])
+            counts.append(k)
+    return schedule, counts
+
+
+### MEASUREMENTS ###
+
+def measure(config):
+    """Runs one (D, n_neurons, target, trials) setting; returns comparison values per count and costs."""
+    D, n_neurons, target, trials = config
+    schedule, counts = make_schedule(trials)
+
+    start = time.time()
+    model, probe = build_counting(D, n_neurons, target, schedule)
+    with nengo.Simulator(model, seed=SEED, progress_bar=False) as sim:
+        build_time = time.time() - start
+        start = time.time()
+        sim.run(PRESENT_TIME * len(schedule), progress_bar=False)
+        step_time = (time.time() - start) / sim.n_steps
+
+    # Mean comparison value over the settled part of every presentation
+    t = sim.trange()
+    values = dict((k, []) for k in range(len(COLORS) + 1))
+    for i, k in enumerate(counts):
+        window = (t >= i * PRESENT_TIME + SETTLE_TIME) & (t < (i + 1) * PRESENT_TIME)
+        values[k].append(np.mean(sim.data[probe][window, 0]))
+
+    # Every count below the target has to stay under the threshold, the target count has to exceed it
+    # (counts above the target are not compared: with unitary pointers TRUE^5 . TRUE^4 is close to 0)
+    below = max(value for k in range(target) for value in values[k])
+    at = min(values[target])
+    return {
+        "config": config,
+        "neurons": sum(ens.n_neurons for ens in model.all_ensembles),
+        "build_time": build_time,
+        "step_time": step_time,
+        "values": values,
+        "separated": below < STOP_SIM_THRESHOLD < at,
+        "margin": min(at - STOP_SIM_THRESHOLD, STOP_SIM_THRESHOLD - below),
+    }
+
+
+def report(results):
+    counts = range(len(COLORS) + 1)
+    print("%4s %6s %6s %8s %10s %10s  %s  %8s %4s" % (
+        "D", "N", "target", "neurons", "build [s]", "step [ms]",
+        " ".join("%11s" % ("k=%d" % k) for k in counts), "margin", "ok"))
+    best = {}
+    for result in sorted(results, key=lambda r: r["neurons"]):
+        D, n_neurons, target, _ = result["config"]
+        if result["separated"] and target not in best:
+            best[target] = result
+        print("%4d %6d %6d %8d %10.2f %10.3f  %s  %8.3f %4s" % (
+            D, n_neurons, target, result["neurons"], result["build_time"],
+            1000 * result["step_time"],
+            " ".join("%5.2f+-%4.2f" % (np.mean(result["values"][k]), np.std(result["values"][k]))
+                     for k in counts),
+            result["margin"], "yes" if result["separated"] else "no"))
+
+    print("")
+    for target in sorted(set(result["config"][2] for result in results)):
+        if target in best:
+            D, n_neurons, _, _ = best[target]["config"]
+            print("Target %d: cheapest setting that separates fewer than %d colors from %d "
+                  "at %.2f is D=%d, N_NEURONS=%d (%d neurons)" % (
+                      target, target, target, STOP_SIM_THRESHOLD, D, n_neurons,
+                      best[target]["neurons"]))
+        else:
+            print("Target %d: no setting separates fewer than %d colors from %d at %.2f" % (
+                target, target, target, STOP_SIM_THRESHOLD))
+
+
+### MAIN ###
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Accuracy/cost sweep for the circular-convolution counting network.")
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[16, 32, 64])
+    parser.add_argument("--neurons", type=int, nargs="+", default=[25, 50, 100],
+                        help="values of N_NEURONS for the circular convolutions")
+    parser.add_argument("--targets", type=int, nargs="+", default=[COLORS_TO_FIND],
+                        help="numbers of colors to find (COLORS_TO_FIND)")
+    parser.add_argument("--trials", type=int, default=TRIALS)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+    if any(not 1 <= target <= len(COLORS) for target in args.targets):
+        parser.error("--targets must be between 1 and %d" % len(COLORS))
+
+    configs = [config + (args.trials,) for config in itertools.product(
+        args.dimensions, args.neurons, args.targets)]
+    pool = multiprocessing.Pool(args.processes)
+    results = pool.map(measure, configs)
+    pool.close()
+    report(results)
@@ -0,0 +1,149 @@
+### IMPORTS ###
+
+import argparse
+import itertools
+import multiprocessing
+import time
+
+import nengo
+import numpy as np
+import nengo.spa as spa
+
+
+### CONSTANTS ###
+
+SEED = 0 # Seed for vocabulary and simulator
+ONSET = 0.3 # Time at which the color is seen (in seconds)
+PULSE = 0.1 # Time spent on the colored cell (in seconds; about one cell at the usual agent speed)
+HOLD_TIME = 5.0 # Time the memory has to keep storing TRUE after the pulse (in seconds)
+LATCH_THRESHOLD = 0.5 # Similarity with TRUE above which the memory counts as latched
+SETTLE_TIME = 0.1 # Time after the pulse that is not counted for the hold (in seconds; at most half the hold time)
+
+
+### CLEANUP LOOP ###
+
+def build_cleanup(D, neurons_per_dimension, cleanup_neurons, synapse, pulse=PULSE, seed=SEED):
+    """Builds one boolean memory with its cleanup loop, as in Components/cleanup_memory.py.
+
+    The memory receives FALSE at the start and TRUE-FALSE for `pulse` seconds
+    from ONSET on. Returns the model and a probe on the memory's similarity
+    with TRUE.
+    """
+    rng = np.random.RandomState(seed)
+    vocab = spa.Vocabulary(D, unitary=True, rng=rng)
+    vocab.add("FALSE", [1.] + [0.]*(D-1))
+    vocab.parse("TRUE")
+    true, false = vocab["TRUE"].v, vocab["FALSE"].v
+
+    with spa.SPA(seed=seed) as model:
+        model.memory = spa.State(D, vocab=vocab, neurons_per_dimension=neurons_per_dimension)
+
+        # Cleanup memory (same as spa.AssociativeMemory with wta_output=True, but with configurable neurons)
+        cleanup = nengo.networks.AssociativeMemory(vocab.vectors, n_neurons=cleanup_neurons)
+        cleanup.add_wta_network(3.0, 0.005)
+        nengo.Connection(model.memory.output, cleanup.input, synapse=synapse)
+        nengo.Connection(cleanup.output, model.memory.input, synapse=synapse)
+
+        # Initial "FALSE", followed by "TRUE-FALSE" while the color is seen
+        def memory_input(t):
+            if t < 0.05:
+                return false
+            elif ONSET <= t < ONSET + pulse:
+                return true - false
+            return np.zeros(D)
+        stim = nengo.Node(memory_input)
+        nengo.Connection(stim, model.memory.input)
+
+        similarity = nengo.Node(size_in=1)
+        nengo.Connection(model.memory.output, similarity, transform=[true], synapse=None)
+        probe = nengo.Probe(similarity, synapse=0.01)
+
+    return model, probe
+
+
+### MEASUREMENTS ###
+
+def measure(config):
+    """Runs one configuration and returns its latency, hold stability and cost."""
+    D, neurons_per_dimension, cleanup_neurons, synapse, pulse, hold_time = config
+    start = time.time()
+    model, probe = build_cleanup(D, neurons_per_dimension, cleanup_neurons, synapse, pulse)
+    with nengo.Simulator(model, seed=SEED, progress_bar=False) as sim:
+        build_time = time.time() - start
+        start = time.time()
+        sim.run(ONSET + pulse + hold_time, progress_bar=False)
+        run_time = time.time() - start
+
+    t = sim.trange()
+    similarity = sim.data[probe][:, 0]
+    latched = similarity > LATCH_THRESHOLD
+
+    # Settling latency: time from onset until the memory first stores TRUE
+    after_onset = np.flatnonzero(latched & (t >= ONSET))
+    latency = t[after_onset[0]] - ONSET if len(after_onset) > 0 else None
+
+    # Hold stability: spurious latches before onset, and how well TRUE is kept after the pulse
+    before = latched[(t > 0.1) & (t < ONSET)]
+    hold = similarity[t >= ONSET + pulse + min(SETTLE_TIME, hold_time / 2.)]
+    return {
+        "config": config,
+        "neurons": sum(ens.n_neurons for ens in model.all_ensembles),
+        "build_time": build_time,
+        "speed": (ONSET + pulse + hold_time) / run_time,
+        "latency": latency,
+        "false_latch": bool(np.any(before)),
+        "hold_min": np.min(hold),
+        "hold_fraction": np.mean(hold > LATCH_THRESHOLD),
+    }
+
+
+def report(results, max_latency):
+    print("%4s %6s %8s %8s %8s %10s %10s %10s %9s %9s %6s" % (
+        "D", "n/dim", "cleanup", "synapse", "neurons", "build [s]", "sim/wall",
+        "latency", "hold min", "hold [%]", "ok"))
+    best = None
+    for result in sorted(results, key=lambda r: r["neurons"]):
+        D, neurons_per_dimension, cleanup_neurons, synapse, _, _ = result["config"]
+        ok = (result["latency"] is not None and result["latency"] <= max_latency
+              and not result["false_latch"] and result["hold_fraction"] == 1.0)
+        if ok and best is None:
+            best = result
+        print("%4d %6d %8d %8.3f %8d %10.2f %10.2f %10s %9.2f %9.1f %6s" % (
+            D, neurons_per_dimension, cleanup_neurons, synapse, result["neurons"],
+            result["build_time"], result["speed"],
+            "-" if result["latency"] is None else "%.3f" % result["latency"],
+            result["hold_min"], 100 * result["hold_fraction"], "yes" if ok else "no"))
+
+    print("")
+    if best is None:
+        print("No configuration latches within %.3f s and holds." % max_latency)
+    else:
+        D, neurons_per_dimension, cleanup_neurons, synapse, _, _ = best["config"]
+        print("Cheapest configuration: D=%d, neurons_per_dimension=%d, cleanup neurons=%d, "
+              "synapse=%.3f (%d neurons)" % (D, neurons_per_dimension, cleanup_neurons, synapse,
+                                             best["neurons"]))
+
+
+### MAIN ###
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Settling-time benchmark for the boolean cleanup memories.")
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[16, 32, 64])
+    parser.add_argument("--neurons-per-dimension", type=int, nargs="+", default=[25, 50])
+    parser.add_argument("--cleanup-neurons", type=int, nargs="+", default=[25, 50])
+    parser.add_argument("--synapses", type=float, nargs="+", default=[0.005, 0.01, 0.02])
+    parser.add_argument("--pulse", type=float, default=PULSE, help="time spent on the colored cell")
+    parser.add_argument("--hold", type=float, default=HOLD_TIME, help="time TRUE has to be held")
+    parser.add_argument("--max-latency", type=float, default=PULSE,
+                        help="largest acceptable settling latency")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+    if args.hold <= 0:
+        parser.error("--hold must be positive")
+
+    configs = [config + (args.pulse, args.hold) for config in itertools.product(
+        args.dimensions, args.neurons_per_dimension, args.cleanup_neurons, args.synapses)]
+    pool = multiprocessing.Pool(args.processes)
+    results = pool.map(measure, configs)
+    pool.close()
+    report(results, args.max_latency)
@@ -0,0 +1,157 @@
+### IMPORTS ###
+
+import argparse
+import itertools
+import multiprocessing
+import time
+
+import nengo
+import numpy as np
+import nengo.spa as spa
+
+from colour_critter import COLORS, D, N_NEURONS, make_vocabs
+from memory_bank import ColorMemoryBank
+from color_gate import ColorGate
+
+
+### CONSTANTS ###
+
+METHODS = ["bg", "gate"] # Basal ganglia and thalamus, or ColorGate
+TRIALS = 5 # Number of random color sequences (and seeds) per method
+N_SHOWN = 3 # Number of colors seen per trial
+ONSET = 0.3 # Time at which the first color is seen (in seconds)
+PULSE = 0.1 # Time every color is seen (in seconds; about one cell at the usual agent speed)
+GAP = 0.3 # Time between two colors (in seconds)
+LATCH_THRESHOLD = 0.5 # Similarity with TRUE above which a memory counts as latched
+
+
+### LATCHING NETWORK ###
+
+# Random sequence of N_SHOWN colors for a trial
+def make_sequence(seed):
+    rng = np.random.RandomState(seed)
+    return [COLORS[i] for i in rng.choice(len(COLORS), N_SHOWN, replace=False)]
+
+def build_latching(method, dimensions, n_neurons, sequence, seed):
+    """Builds the color latching part of colour_critter.py with the given selection method.
+
+    The color recognizer sees every color of `sequence` for PULSE seconds (and
+    NONE in between), and the selection (method "bg" or "gate") latches the
+    colors into a ColorMemoryBank. Returns the model, the selection network
+    and a probe on the similarity of every memory with TRUE.
+    """
+    color_vocab, bool_vocab = make_vocabs(dimensions, rng=np.random.RandomState(seed))
+
+    def color_pointer(t):
+        i = int((t - ONSET) // (PULSE + GAP))
+        if t >= ONSET and i < len(sequence) and t - ONSET - i * (PULSE + GAP) < PULSE:
+            return sequence[i]
+        return "NONE"
+
+    with spa.SPA(seed=seed) as model:
+        model.color_recognizer = spa.State(dimensions, vocab=color_vocab)
+        model.current_color = spa.Input(color_recognizer=color_pointer)
+        model.memory = ColorMemoryBank(COLORS, bool_vocab, label="memory")
+
+        if method == "gate":
+            model.color_gate = ColorGate(COLORS, color_vocab, bool_vocab, n_neurons=n_neurons)
+            nengo.Connection(model.color_recognizer.output, model.color_gate.input)
+            for color in COLORS:
+                nengo.Connection(model.color_gate.outputs[color.lower()][0],
+                                 model.memory.inputs[color.lower()][0])
+            selection = [model.color_gate]
+        else:
+            actions = ['dot(color_recognizer, %s) --> memory_%s=TRUE-FALSE' % (color, color.lower())
+                       for color in COLORS]
+            model.basal_ganglia = spa.BasalGanglia(spa.Actions(*(actions + ['0.5 --> '])))
+            model.thalamus = spa.Thalamus(model.basal_ganglia)
+            selection = [model.basal_ganglia, model.thalamus]
+
+        similarity = nengo.Node(size_in=len(COLORS))
+        for i, color in enumerate(COLORS):
+            nengo.Connection(model.memory.outputs[color.lower()][0], similarity[i],
+                             transform=[bool_vocab["TRUE"].v], synapse=None)
+        probe = nengo.Probe(similarity, synapse=0.01)
+
+    return model, selection, probe
+
+
+### MEASUREMENTS ###
+
+def measure(config):
+    """Runs one (method, dimensions, n_neurons, trial) setting; returns latencies, errors and costs."""
+    method, dimensions, n_neurons, trial = config
+    sequence = make_sequence(trial)
+    sim_time = ONSET + len(sequence) * (PULSE + GAP)
+
+    start = time.time()
+    model, selection, probe = build_latching(method, dimensions, n_neurons, sequence, seed=trial)
+    with nengo.Simulator(model, seed=trial, progress_bar=False) as sim:
+        build_time = time.time() - start
+        start = time.time()
+        sim.run(sim_time, progress_bar=False)
+        run_time = time.time() - start
+
+    t = sim.trange()
+    latched = sim.data[probe] > LATCH_THRESHOLD
+
+    # Latency from the onset of every seen color until its memory latches
+    latencies = []
+    for i, color in enumerate(sequence):
+        onset = ONSET + i * (PULSE + GAP)
+        after = np.flatnonzero(latched[:, COLORS.index(color)] & (t >= onset))
+        latencies.append(t[after[0]] - onset if len(after) > 0 else None)
+
+    # Errors: seen colors that are not latched at the end, and unseen colors that are
+    final = latched[-1]
+    seen = np.array([color in sequence for color in COLORS])
+    return {
+        "config": config,
+        "neurons": sum(ens.n_neurons for network in selection for ens in network.all_ensembles),
+        "build_time": build_time,
+        "speed": sim_time / run_time,
+        "latencies": latencies,
+        "misses": int(np.sum(seen & ~final)),
+        "false_latches": int(np.sum(~seen & final)),
+    }
+
+
+def report(results):
+    print("%6s %4s %6s %8s %10s %10s %10s %8s %8s %10s %9s" % (
+        "method", "D", "N", "neurons", "lat. mean", "lat. max", "error [%]", "misses",
+        "false", "build [s]", "sim/wall"))
+    groups = itertools.groupby(sorted(results, key=lambda r: r["config"][:3]),
+                               key=lambda r: r["config"][:3])
+    for (method, dimensions, n_neurons), group in groups:
+        group = list(group)
+        latencies = [l for r in group for l in r["latencies"] if l is not None]
+        misses = sum(r["misses"] for r in group)
+        false_latches = sum(r["false_latches"] for r in group)
+        print("%6s %4d %6d %8d %10s %10s %10.1f %8d %8d %10.2f %9.3f" % (
+            method, dimensions, n_neurons, group[0]["neurons"],
+            "%.3f" % np.mean(latencies) if latencies else "-",
+            "%.3f" % np.max(latencies) if latencies else "-",
+            100. * (misses + false_latches) / (len(group) * len(COLORS)), misses, false_latches,
+            np.mean([r["build_time"] for r in group]), np.mean([r["speed"] for r in group])))
+
+
+### MAIN ###
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare basal ganglia/thalamus and ColorGate color latching.")
+    parser.add_argument("--methods", nargs="+", default=METHODS, choices=METHODS)
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[D])
+    parser.add_argument("--neurons", type=int, nargs="+", default=[N_NEURONS],
+                        help="neurons per gate (the basal ganglia and thalamus use their defaults)")
+    parser.add_argument("--trials", type=int, default=TRIALS)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    # The basal ganglia and thalamus do not depend on the number of gate neurons
+    configs = [(method, dimensions, n_neurons if method == "gate" else N_NEURONS, trial)
+               for method, dimensions, n_neurons, trial in itertools.product(
+                   args.methods, args.dimensions, args.neurons, range(args.trials))]
+    pool = multiprocessing.Pool(args.processes)
+    results = pool.map(measure, sorted(set(configs)))
+    pool.close()
+    report(results)
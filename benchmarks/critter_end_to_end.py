@@ -0,0 +1,169 @@
+### IMPORTS ###
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+
+import nengo
+import numpy as np
+
+from colour_critter import MAP, DEFAULT_CONFIG, build_model
+from termination import add_termination, run_until_done
+
+
+### CONSTANTS ###
+
+# Maps the critter is benchmarked on (each with all five colors)
+MAPS = {
+    "default": MAP,
+    "mirrored": "\n".join(line[::-1] for line in MAP.splitlines()),
+    "wide": """
+###########
+#G   #   R#
+#  #   #  #
+#B   M   Y#
+###########
+""",
+}
+SEEDS = [2, 4] # Seeds for the model (neurons, random process, vocabularies) and the start position
+MAX_TIME = 30.0 # Longest simulated time per case (in seconds; with SEEDS, the spiking critter is done on every map before it)
+TOLERANCE = 0.2 # Relative slowdown (or memory increase) compared to the baseline that counts as a regression
+DONE_TOLERANCE = 0.05 # Change of the time-to-done (in simulated seconds) that counts as a change of behaviour
+MACHINE_KEY = "machine" # Entry of the baseline file that describes where it was measured
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "critter_baseline.json")
+
+
+### RUNNING ONE CASE ###
+
+# Name under which a case is stored in the baseline file
+def case_name(case):
+    map_name, seed, fidelity, exploration, _ = case
+    return "%s/seed=%d/%s%s" % (map_name, seed, fidelity, "/explore" if exploration else "")
+
+def run_case(case):
+    """Builds and runs the complete critter for one (map, seed, fidelity, exploration, max_time) case.
+
+    The agent starts on a random free cell picked with the seed, and the run
+    ends when the critter is done (or after max_time). Meant to run in a
+    fresh worker process, so the peak RSS belongs to this case only.
+    """
+    map_name, seed, fidelity, exploration, max_time = case
+    start = time.time()
+    world, body, model = build_model({"map": MAPS[map_name], "start": None, "seed": seed,
+                                      "fidelity": fidelity, "exploration": exploration})
+    termination = add_termination(model, model.done, model.memory_outputs, vocab=model.bool_vocab)
+    with nengo.Simulator(model, seed=seed, progress_bar=False) as sim:
+        build_time = time.time() - start
+        start = time.time()
+        done_time = run_until_done(sim, termination, max_time)
+        run_time = time.time() - start
+        sim_time = sim.time
+
+    return {
+        "name": case_name(case),
+        "build_time": build_time,
+        "wall_per_sim_second": run_time / sim_time,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.,
+        "done_time": done_time,
+    }
+
+
+### COMPARING WITH THE BASELINE ###
+
+# Machine and versions the timings depend on (stored with the baseline)
+def machine_info():
+    return {"system": platform.system(), "machine": platform.machine(),
+            "cpus": multiprocessing.cpu_count(), "python": platform.python_version(),
+            "nengo": nengo.__version__, "numpy": np.__version__}
+
+def format_ratio(value, base):
+    return "-" if base is None else "%.2fx" % (value / base)
+
+# Whether the critter stopped at another time than in the baseline (or only in one of them)
+def done_time_changed(done_time, base_done_time, done_tolerance):
+    if done_time is None or base_done_time is None:
+        return done_time != base_done_time
+    return abs(done_time - base_done_time) > done_tolerance
+
+def report(results, baseline, tolerance, done_tolerance=DONE_TOLERANCE):
+    """Prints every case next to its baseline; returns the names of the cases that regressed.
+
+    A case regresses when it is more than `tolerance` slower (or larger) than
+    the baseline, or when its time-to-done moved by more than
+    `done_tolerance` (the runs are seeded, so this means the behaviour of the
+    model changed, beyond the floating point differences between platforms).
+    """
+    print("%-32s %10s %10s %10s %9s   %8s %8s %8s %9s" % (
+        "case", "build [s]", "wall/sim", "RSS [MB]", "done [s]",
+        "build", "wall/sim", "RSS", "done"))
+    regressions = []
+    for result in results:
+        base = baseline.get(result["name"], {})
+        done = "-" if result["done_time"] is None else "%.3f" % result["done_time"]
+        done_changed = bool(base) and done_time_changed(result["done_time"], base["done_time"],
+                                                        done_tolerance)
+        slower = [key for key in ("build_time", "wall_per_sim_second", "peak_rss_mb")
+                  if key in base and result[key] > (1 + tolerance) * base[key]]
+        if slower or done_changed:
+            regressions.append(result["name"])
+        print("%-32s %10.2f %10.2f %10.1f %9s   %8s %8s %8s %9s%s" % (
+            result["name"], result["build_time"], result["wall_per_sim_second"],
+            result["peak_rss_mb"], done,
+            format_ratio(result["build_time"], base.get("build_time")),
+            format_ratio(result["wall_per_sim_second"], base.get("wall_per_sim_second")),
+            format_ratio(result["peak_rss_mb"], base.get("peak_rss_mb")),
+            "-" if not base else ("changed" if done_changed else "same"),
+            "  REGRESSION" if result["name"] in regressions else ""))
+    return regressions
+
+
+### MAIN ###
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reproducible end-to-end benchmark of the complete critter.")
+    parser.add_argument("--maps", nargs="+", default=sorted(MAPS), choices=sorted(MAPS))
+    parser.add_argument("--seeds", type=int, nargs="+", default=SEEDS)
+    parser.add_argument("--fidelity", default=DEFAULT_CONFIG["fidelity"], choices=["direct", "rate", "spiking"])
+    parser.add_argument("--explore", action="store_true", default=DEFAULT_CONFIG["exploration"],
+                        help="use the frontier exploration controller")
+    parser.add_argument("--max-time", type=float, default=MAX_TIME)
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline file to compare with")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store the results in the baseline file (replacing cases with the same name)")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--done-tolerance", type=float, default=DONE_TOLERANCE,
+                        help="largest accepted change of the time-to-done (in simulated seconds)")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="number of worker processes (more than one distorts the timings)")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    cases = [(map_name, seed, args.fidelity, args.explore, args.max_time)
+             for map_name in args.maps for seed in args.seeds]
+    pool = multiprocessing.Pool(args.processes, maxtasksperchild=1)
+    results = pool.map(run_case, cases, chunksize=1)
+    pool.close()
+
+    if args.save_baseline:
+        baseline.update((result["name"], result) for result in results)
+        baseline[MACHINE_KEY] = machine_info()
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print("Stored %d cases in %s" % (len(results), args.baseline))
+    else:
+        if not baseline:
+            print("No baseline in %s (store one with --save-baseline)" % args.baseline)
+        elif baseline.get(MACHINE_KEY) != machine_info():
+            print("The baseline was measured on another machine or with other versions, so the")
+            print("timings are not comparable: %s" % baseline.get(MACHINE_KEY))
+        regressions = report(results, baseline, args.tolerance, args.done_tolerance)
+        sys.exit(1 if regressions else 0)
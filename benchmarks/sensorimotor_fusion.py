@@ -0,0 +1,156 @@
+### IMPORTS ###
+
+import argparse
+import multiprocessing
+import time
+
+import grid
+import nengo
+import numpy as np
+
+from colour_critter import (Cell, MAP, D, DEFAULT_CONFIG, Actuator, AgentInterface, make_vocabs,
+                            radar_readings, color_name, build_model)
+
+
+### CONSTANTS ###
+
+SEED = 0 # Seed for the vocabularies, the model and the simulator
+WARMUP_STEPS = 200 # Steps simulated before the measurement
+STEPS = 2000 # Steps over which the time per step is measured
+REPEATS = 3 # Measurements per case (the fastest one counts)
+SCOPES = ["interface", "critter"] # Only the agent interface nodes, or the complete critter
+
+
+### RECORDING THE MOTOR COMMANDS ###
+
+class RecordingActuator(Actuator):
+    """Actuator that also stores the (speed, rotation) command of every step in `commands`."""
+
+    def __init__(self, agents):
+        self.commands = []
+        super(RecordingActuator, self).__init__(agents)
+
+    def make_step(self, shape_in, shape_out, dt, rng):
+        move = super(RecordingActuator, self).make_step(shape_in, shape_out, dt, rng)
+        commands = self.commands
+        def step(t, x):
+            commands.append(np.array(x))
+            return move(t, x)
+        return step
+
+def record_commands(fidelity, n_steps=WARMUP_STEPS + REPEATS*STEPS):
+    """Runs the critter with separate interface nodes; returns its motor commands (n_steps x 2)."""
+    world, body, model = build_model({"fidelity": fidelity, "fused_interface": False,
+                                      "seed": SEED})
+    recorder = RecordingActuator([body])
+    model.movement.output = recorder
+    with nengo.Simulator(model, seed=SEED, progress_bar=False) as sim:
+        sim.run_steps(n_steps, progress_bar=False)
+    return np.array(recorder.commands)
+
+# Replaces the connections into `model.movement` by a node that replays `commands`
+def replay_commands(model, commands):
+    for network in [model] + model.all_networks:
+        for connection in list(network.connections):
+            if connection.post_obj is model.movement:
+                network.connections.remove(connection)
+    with model:
+        replay = nengo.Node(nengo.processes.PresentInput(commands, presentation_time=0.001))
+        nengo.Connection(replay, model.movement, synapse=None)
+
+
+### MODELS ###
+
+def build_interface(fused, seed=SEED):
+    """Builds a model with only the agent interface of colour_critter.py; returns the model and the agent.
+
+    Without `fused`, it has the separate nodes of build_model: an Actuator, a
+    radar node and a color node that parses the color name in every step (as
+    spa.Input does). The radar readings and color vectors end in passthrough
+    nodes in both cases.
+    """
+    world = grid.World(Cell, map=MAP, directions=4)
+    body = grid.ContinuousAgent()
+    x, y, direction = DEFAULT_CONFIG["start"]
+    world.add(body, x=x, y=y, dir=direction)
+    color_vocab, _ = make_vocabs(D, rng=np.random.RandomState(seed))
+
+    with nengo.Network(seed=seed) as model:
+        radar = nengo.Node(size_in=3)
+        color = nengo.Node(size_in=D)
+        if fused:
+            model.movement = nengo.Node(AgentInterface([body], color_vocab), size_in=2)
+            nengo.Connection(model.movement[:3], radar, synapse=None)
+            nengo.Connection(model.movement[3:], color, synapse=None)
+        else:
+            model.movement = nengo.Node(Actuator([body]), size_in=2)
+            nengo.Connection(nengo.Node(lambda t: radar_readings(body)), radar, synapse=None)
+            nengo.Connection(nengo.Node(lambda t: color_vocab.parse(color_name(body)).v), color,
+                             synapse=None)
+    return model, body
+
+
+### MEASUREMENTS ###
+
+# Python node functions called every step (nodes with a function or process as output)
+def count_callbacks(model):
+    return sum(1 for node in model.all_nodes
+               if callable(node.output) or isinstance(node.output, nengo.Process))
+
+def measure(case):
+    """Measures the time per step of one (scope, fidelity, fused) case.
+
+    Both variants are driven by the same recorded motor commands, so the
+    agent takes the same path in every case. Returns the number of Python
+    node callbacks per step, the fastest time per step (in seconds) over
+    REPEATS runs and the final pose of the agent.
+    """
+    scope, fidelity, fused, commands = case
+    if scope == "interface":
+        model, body = build_interface(fused)
+    else:
+        world, body, model = build_model({"fidelity": fidelity, "fused_interface": fused,
+                                          "seed": SEED})
+    replay_commands(model, commands)
+    times = []
+    with nengo.Simulator(model, seed=SEED, progress_bar=False) as sim:
+        sim.run_steps(WARMUP_STEPS, progress_bar=False)
+        for _ in range(REPEATS):
+            start = time.time()
+            sim.run_steps(STEPS, progress_bar=False)
+            times.append((time.time() - start) / STEPS)
+    return {"case": (scope, fidelity, fused), "callbacks": count_callbacks(model),
+            "step_time": min(times), "pose": (body.x, body.y, body.dir)}
+
+
+def report(results):
+    print("%10s %9s %10s %10s %10s %9s %6s" % ("scope", "fidelity", "interface", "callbacks",
+                                               "step [us]", "speedup", "path"))
+    by_case = dict((result["case"], result) for result in results)
+    for (scope, fidelity, fused), result in sorted(by_case.items()):
+        separate = by_case.get((scope, fidelity, False))
+        print("%10s %9s %10s %10d %10.1f %9s %6s" % (
+            scope, "-" if scope == "interface" else fidelity, "fused" if fused else "separate",
+            result["callbacks"], 1e6 * result["step_time"],
+            "%.2fx" % (separate["step_time"] / result["step_time"]) if separate else "-",
+            "-" if not separate else "same" if separate["pose"] == result["pose"] else "DIFF"))
+
+
+### MAIN ###
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare separate agent interface nodes with the fused AgentInterface.")
+    parser.add_argument("--scopes", nargs="+", default=SCOPES, choices=SCOPES)
+    parser.add_argument("--fidelity", default="direct", choices=["direct", "rate", "spiking"],
+                        help="neurons of the complete critter (and of the run the commands are recorded from)")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="number of worker processes (more than one distorts the timings)")
+    args = parser.parse_args()
+
+    commands = record_commands(args.fidelity)
+    cases = [(scope, args.fidelity, fused, commands)
+             for scope in args.scopes for fused in (False, True)]
+    pool = multiprocessing.Pool(args.processes, maxtasksperchild=1)
+    results = pool.map(measure, cases, chunksize=1)
+    pool.close()
+    report(results)
@@ -0,0 +1,49 @@
+### IMPORTS ###
+
+import nengo
+from nengo.networks import EnsembleArray
+from nengo.spa.module import Module
+
+
+### COLOR GATE ###
+
+class ColorGate(Module):
+    """Thresholded gates that latch recognized colors into their memories.
+
+    A lightweight replacement for a basal ganglia and thalamus running one
+    `dot(color_recognizer, X) --> x_memory=TRUE-FALSE` action per color. Every
+    color has a single one-dimensional ensemble that receives the similarity
+    of the input with the color and only fires above `threshold`; its output
+    adds `effect` (a pointer of `bool_vocab`) to the memory of that color. The
+    number of neurons grows linearly with the number of colors.
+
+    The input is the color pointer; every color is available as SPA output
+    named after the color, to be connected to the input of its memory.
+    """
+
+    def __init__(self, colors, color_vocab, bool_vocab, effect="TRUE-FALSE", n_neurons=50,
+                 threshold=0.5, synapse=0.01, label=None, seed=None, add_to_container=None):
+        super(ColorGate, self).__init__(label, seed, add_to_container)
+
+        self.colors = [color.lower() for color in colors]
+        effect_vector = bool_vocab.parse(effect).v
+
+        with self:
+            self.input = nengo.Node(size_in=color_vocab.dimensions, label="input")
+
+            # One gate per color, driven by the similarity of the input with that color
+            self.gates = EnsembleArray(n_neurons, len(self.colors),
+                                       intercepts=nengo.dists.Uniform(threshold, 1),
+                                       encoders=nengo.dists.Choice([[1]]), label="gates")
+            nengo.Connection(self.input, self.gates.input, synapse=None,
+                             transform=[color_vocab[color.upper()].v for color in self.colors])
+            gated = self.gates.add_output("gated", lambda x: x > threshold)
+
+            # Output of every gate, scaled to the effect on the memory
+            for i, color in enumerate(self.colors):
+                color_output = nengo.Node(size_in=bool_vocab.dimensions, label=color)
+                nengo.Connection(gated[i], color_output, transform=effect_vector[:, None],
+                                 synapse=synapse)
+                self.outputs[color] = (color_output, bool_vocab)
+
+        self.inputs["default"] = (self.input, color_vocab)
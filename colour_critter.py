@@ -1,11 +1,19 @@
 ### IMPORTS ###
 
+import math
+import sys
+from random import Random
+
 import grid
 import nengo
 import numpy as np 
 import nengo.spa as spa
 import nengo.networks as networks
 
+from memory_bank import ColorMemoryBank
+from color_gate import ColorGate
+from exploration import FrontierExplorer
+
 
 ### CONSTANTS ###
 
@@ -18,6 +26,7 @@ MAP="""
 #######
 """
 
+COLORS = ["GREEN", "RED", "BLUE", "MAGENTA", "YELLOW"] # Colors that can be found (in order of cell color code)
 COLORS_TO_FIND = 4 # Number of colors to find before stopping (max. 5)
 
 N_NEURONS = 50 # Number of neurons for Nengo ensembles
@@ -26,10 +35,17 @@ D = 32 # SPA state dimensionality
 ROTATION_THRESHOLD = 0.8 # Threshold for random rotation in movement function (higher = less rotation)
 STOP_SIM_THRESHOLD = 0.7 # Threshold for stopping (stop if similarity between memory and target exceeds this)
 
+FIDELITY = "spiking" # Neuron model used for the ensembles ("direct", "rate" or "spiking")
+EXPLORATION = False # Drive the agent with the frontier exploration controller instead of the random walk
+MEMORY_BANK = False # Pack all color memories and cleanups into one ColorMemoryBank (faster to build and simulate)
+COLOR_GATE = False # Latch colors with a ColorGate instead of the basal ganglia and thalamus (fewer neurons)
+FUSED_INTERFACE = False # Move the agent and read its sensors in one node call per step (see AgentInterface)
+
 
 ### CELL CLASS ###
 
-class Cell(grid.Cell):
+class Cell(grid.CompactCell):
+    __slots__ = ('cellcolor',)
 
     def color(self):
         if self.wall:
@@ -63,177 +79,441 @@ class Cell(grid.Cell):
             self.cellcolor = 5
 
 
-### INITIALIZING WORLD AND AGENT ###
+### AGENT INTERFACE ###
 
-world = grid.World(Cell, map=MAP, directions=4)
-body = grid.ContinuousAgent()
-world.add(body, x=1, y=2, dir=2)
+RADAR_ANGLES = np.linspace(-0.5, 0.5, 3) # Detector angles relative to the agent (left, forward, right)
+RADAR_RANGE = 4 # Maximum distance seen by the wall distance sensors
 
+MAX_SPEED = 20.0 # Distance moved per second at speed 1 (in cells)
+MAX_ROTATE = 10.0 # Rotation per second at rotation 1 (in grid directions)
+MAX_STEP = 0.25 # Longest distance the agent moves at once (in cells), so it cannot skip cells or pass walls
 
-### MOVEMENT FUNCTION ###
+# Applies a (speed, rotation) command to an agent for `dt` seconds; returns False if a wall was hit
+def actuate(agent, speed, rotation, dt=0.001):
+    # Sweep along the path in sub-steps of at most MAX_STEP (a single step at the usual time steps)
+    distance = speed * dt * MAX_SPEED
+    steps = max(1, int(math.ceil(abs(distance) / MAX_STEP)))
+    moved = True
+    for _ in range(steps):
+        agent.turn(rotation * dt * MAX_ROTATE / steps)
+        moved = agent.go_forward(distance / steps) and moved
+    return moved
 
-def move(t, x):
-    speed, rotation = x
-    dt = 0.001
-    max_speed = 20.0
-    max_rotate = 10.0
-    body.turn(rotation * dt * max_rotate)
-    body.go_forward(speed * dt * max_speed)
-    
+class Actuator(nengo.Process):
+    """Process for a node that moves `agents` with the time step of the simulator.
 
+    The input of the node is the (speed, rotation) command of every agent.
+    After moving them, the changes of their worlds are reported to the
+    subscribers (see World.subscribe), once per time step. `blocked[i]` tells
+    whether a wall stopped agent i in the last step.
+    """
 
-### SPA MODEL ###
+    def __init__(self, agents):
+        self.agents = list(agents)
+        self.blocked = [False] * len(self.agents)
+        super(Actuator, self).__init__(default_size_in=2*len(self.agents), default_size_out=0)
 
-with spa.SPA() as model:
-    
-    ## ENVIRONMENT INITIALIZATION ##
-    
-    # Initialize environment
-    env = grid.GridNode(world, dt=0.005)
-    
-    
-    ## MOVEMENT ##
-    
-    # Node that handles agent movement (input is (speed, rotation))
-    movement = nengo.Node(move, size_in=2)
-    
-    # Node for the three wall distance sensors
-    def detect(t):
-        # Define angles for each detector (left, forward, right)
-        angles = (np.linspace(-0.5, 0.5, 3) + body.dir) % world.directions
-        # Return the distance between the agent and a wall in the given directions
-        return [body.detect(d, max_distance=4)[0] for d in angles]
-    stim_radar = nengo.Node(detect)
-    
-    # Node for random values (filtered noise), to perform random rotations
-    random_process = nengo.processes.FilteredNoise(dist=nengo.dists.Gaussian(0, 0.5), 
-                                                   synapse=nengo.synapses.Alpha(0.1))
-    random = nengo.Node(random_process)
-    
-    # Ensemble that reads sensor and random values
-    radar = nengo.Ensemble(n_neurons=N_NEURONS*10, dimensions=4, radius=4)
-    nengo.Connection(stim_radar, radar[0:3])
-    nengo.Connection(random, radar[3])
-
-    # Movement function, which outputs (speed, rotation) based on radar values
-    def movement_func(x):
-        left, forward, right, random = x
-        # If random value exceeds thresholds, turn in the corresponding direction
-        if abs(random) > ROTATION_THRESHOLD:
-            rotation = abs(random) - forward/4
-            return 0.1, rotation if random > 0 else -rotation
-        # Otherwise, perform simple wall-avoiding behavior
-        return forward/4, right - left
-    
-    # Movement function is driven only by radar values
-    nengo.Connection(radar, movement, function=movement_func)
-    
-    
-    ## COLOR DETECTION ##
-    
+    def make_step(self, shape_in, shape_out, dt, rng):
+        agents, blocked = self.agents, self.blocked
+        def step(t, x):
+            for i, (agent, (speed, rotation)) in enumerate(zip(agents, x.reshape(-1, 2))):
+                blocked[i] = not actuate(agent, speed, rotation, dt)
+            for world in set(agent.world for agent in agents):
+                world.notify_changes()
+        return step
+
+class AgentInterface(nengo.Process):
+    """Process for a single node that moves `agents` and then reads their sensors, once per time step.
+
+    Replaces an Actuator node and separate radar and color nodes: the input
+    is the (speed, rotation) command of every agent, as for Actuator. All
+    agents are moved first, then the output holds for every agent in turn
+    its radar readings (left, forward, right) and the vector of its cell
+    color in `color_vocab` (3 + D values), to be sliced into connections.
+    As for Actuator, `blocked[i]` tells whether a wall stopped agent i.
+
+    The sensors are read after the move of the same step, whereas the
+    separate radar and color nodes (which do not depend on the Actuator) see
+    the pose of the previous step. The critter therefore senses one step
+    earlier with this node, and its runs are not identical to those with
+    separate nodes.
+    """
+
+    def __init__(self, agents, color_vocab):
+        self.agents = list(agents)
+        self.color_vectors = {name: color_vocab[name].v for name in color_vocab.keys}
+        self.size = len(RADAR_ANGLES) + color_vocab.dimensions
+        self.blocked = [False] * len(self.agents)
+        super(AgentInterface, self).__init__(default_size_in=2*len(self.agents),
+                                             default_size_out=self.size*len(self.agents))
+
+    def make_step(self, shape_in, shape_out, dt, rng):
+        agents, color_vectors, size, blocked = (self.agents, self.color_vectors, self.size,
+                                                self.blocked)
+        n_radar = len(RADAR_ANGLES)
+        output = np.zeros(shape_out)
+        def step(t, x):
+            for i, (agent, (speed, rotation)) in enumerate(zip(agents, x.reshape(-1, 2))):
+                blocked[i] = not actuate(agent, speed, rotation, dt)
+            for world in set(agent.world for agent in agents):
+                world.notify_changes()
+            for i, agent in enumerate(agents):
+                output[size*i:size*i+n_radar] = radar_readings(agent)
+                output[size*i+n_radar:size*(i+1)] = color_vectors[color_name(agent)]
+            return output
+        return step
+
+# Returns the distance between the agent and a wall for each detector (left, forward, right)
+def radar_readings(agent):
+    angles = (RADAR_ANGLES + agent.dir) % agent.world.directions
+    return [agent.detect(d, max_distance=RADAR_RANGE)[0] for d in angles]
+
+# Returns the name of the pointer corresponding to the color of the cell occupied by the agent
+def color_name(agent):
+    color = agent.cell.color()
+    return color.upper() if color else "NONE"
+
+
+### VOCABULARIES ###
+
+def make_vocabs(D, rng=None):
+    """Returns the color vocabulary and the boolean vocabulary for dimensionality D."""
     # Vocabulary of colors
-    color_vocab = spa.Vocabulary(D, max_similarity=0)
-    color_vocab.parse("NONE+GREEN+RED+BLUE+MAGENTA+YELLOW")
-    
-    # State that outputs the semantic pointer corresponding to the color of the currently occupied cell
-    model.color_recognizer = spa.State(D, vocab=color_vocab)
-    
-    # Provide pointer corresponding to the color of the current cell as input to color recognizer
-    def color_pointer(t):
-        return body.cell.color().upper() if body.cell.color() else "NONE"
-    model.current_color = spa.Input(color_recognizer=color_pointer)
-    
-    
-    ## COLOR MEMORY ##
+    color_vocab = spa.Vocabulary(D, max_similarity=0, rng=rng)
+    color_vocab.parse("+".join(["NONE"] + COLORS))
     
     # Vocabulary of booleans (true and false)
-    bool_vocab = spa.Vocabulary(D, unitary=True)
+    bool_vocab = spa.Vocabulary(D, unitary=True, rng=rng)
     bool_vocab.add("FALSE", [1.]+[0.]*(D-1))
     bool_vocab.parse("TRUE")
-   
-    # Memories for all colors (supposed to store TRUE if color encountered, FALSE if not)
-    model.green_memory   = spa.State(D, vocab=bool_vocab, label="green")
-    model.red_memory     = spa.State(D, vocab=bool_vocab, label="red")
-    model.blue_memory    = spa.State(D, vocab=bool_vocab, label="blue")
-    model.magenta_memory = spa.State(D, vocab=bool_vocab, label="magenta")
-    model.yellow_memory  = spa.State(D, vocab=bool_vocab, label="yellow")
-    
-    # Provide initial pointer "FALSE" to all color memories
-    def initial_false_input(t):
-        return bool_vocab["FALSE"].v.reshape(D) if t < 0.05 else np.zeros(D)
-    false_input = nengo.Node(initial_false_input)
-    nengo.Connection(false_input, model.green_memory.input)
-    nengo.Connection(false_input, model.red_memory.input)
-    nengo.Connection(false_input, model.blue_memory.input)
-    nengo.Connection(false_input, model.yellow_memory.input)
-    nengo.Connection(false_input, model.magenta_memory.input)
-    
-    # Cleanup memories for all color memories (to ensure that they store clean "boolean" pointers)
-    model.green_cleanup   = spa.AssociativeMemory(bool_vocab, wta_output=True, label="clean G")
-    model.red_cleanup     = spa.AssociativeMemory(bool_vocab, wta_output=True, label="clean R")
-    model.blue_cleanup    = spa.AssociativeMemory(bool_vocab, wta_output=True, label="clean B")
-    model.magenta_cleanup = spa.AssociativeMemory(bool_vocab, wta_output=True, label="clean M")
-    model.yellow_cleanup  = spa.AssociativeMemory(bool_vocab, wta_output=True, label="clean Y")
-    nengo.Connection(model.green_memory.output, model.green_cleanup.input, synapse=0.01)
-    nengo.Connection(model.green_cleanup.output, model.green_memory.input, synapse=0.01)
-    nengo.Connection(model.red_memory.output, model.red_cleanup.input, synapse=0.01)
-    nengo.Connection(model.red_cleanup.output, model.red_memory.input, synapse=0.01)
-    nengo.Connection(model.blue_memory.output, model.blue_cleanup.input, synapse=0.01)
-    nengo.Connection(model.blue_cleanup.output, model.blue_memory.input, synapse=0.01)
-    nengo.Connection(model.magenta_memory.output, model.magenta_cleanup.input, synapse=0.01)
-    nengo.Connection(model.magenta_cleanup.output, model.magenta_memory.input, synapse=0.01)
-    nengo.Connection(model.yellow_memory.output, model.yellow_cleanup.input, synapse=0.01)
-    nengo.Connection(model.yellow_cleanup.output, model.yellow_memory.input, synapse=0.01)
-
-    # Remove "FALSE" and add "TRUE" to a memory when its corresponding color is recognized
-    actions = spa.Actions(
-        'dot(color_recognizer, GREEN)   --> green_memory=TRUE-FALSE',
-        'dot(color_recognizer, RED)     --> red_memory=TRUE-FALSE',
-        'dot(color_recognizer, BLUE)    --> blue_memory=TRUE-FALSE',
-        'dot(color_recognizer, MAGENTA) --> magenta_memory=TRUE-FALSE',
-        'dot(color_recognizer, YELLOW)  --> yellow_memory=TRUE-FALSE',
-        '0.5 --> '
-    )
-    model.basal_ganglia = spa.BasalGanglia(actions)
-    model.thalamus = spa.Thalamus(model.basal_ganglia)
-    
-    
-    ## COUNTING COLORS ##
-    
-    # Convolve all memories together
-    model.cconv_gr    = networks.CircularConvolution(N_NEURONS, D, label="G*R")
-    model.cconv_bm    = networks.CircularConvolution(N_NEURONS, D, label="B*M")
-    model.cconv_bmy   = networks.CircularConvolution(N_NEURONS, D, label="B*M*Y")
-    model.cconv_grbmy = networks.CircularConvolution(N_NEURONS, D, label="G*R*B*M*Y")
-    nengo.Connection(model.green_memory.output, model.cconv_gr.A)
-    nengo.Connection(model.red_memory.output, model.cconv_gr.B)
-    nengo.Connection(model.blue_memory.output, model.cconv_bm.A)
-    nengo.Connection(model.magenta_memory.output, model.cconv_bm.B)
-    nengo.Connection(model.cconv_bm.output, model.cconv_bmy.A)
-    nengo.Connection(model.yellow_memory.output, model.cconv_bmy.B)
-    nengo.Connection(model.cconv_gr.output, model.cconv_grbmy.A)
-    nengo.Connection(model.cconv_bmy.output, model.cconv_grbmy.B)
-     
-    # Specify what the convolved memory looks like when the desired number of colors has been encountered
-    model.target = spa.State(D, vocab=bool_vocab)
-    model.target_input = spa.Input(target = ("*TRUE"*COLORS_TO_FIND)[1:])
+    return color_vocab, bool_vocab
+
+color_vocab, bool_vocab = make_vocabs(D)
+
+
+### CRITTER NETWORK ###
+
+# Neuron model for every fidelity setting (direct mode computes the decoded functions exactly)
+NEURON_TYPES = {"direct": nengo.Direct(), "rate": nengo.LIFRate(), "spiking": nengo.LIF()}
+
+def build_critter(model, radar_input, motor_output, fidelity=FIDELITY, explorer=None,
+                  n_neurons=N_NEURONS, radar_neurons=N_NEURONS*10, color_vocab=color_vocab,
+                  bool_vocab=bool_vocab, memory_bank=MEMORY_BANK, color_gate=COLOR_GATE,
+                  seed=None):
+    """Adds the neural network of a single critter to the SPA network `model`.
+
+    `radar_input` must provide the three wall distances (left, forward, right)
+    and `motor_output` receives the (speed, rotation) command. Both may be
+    slices of larger nodes, so that several critters can share one sensor node
+    and one motor node. The color of the current cell has to be provided to
+    `model.color_recognizer` by the caller.
+
+    `fidelity` selects the neuron model of all ensembles ("direct", "rate" or
+    "spiking"). In direct mode the radar and the action selection keep rate
+    neurons, because they depend on neuron-level inhibition and rectification.
+
+    If a FrontierExplorer is given as `explorer`, it provides the movement
+    commands instead of the radar-based random walk, until the critter is done.
+
+    `n_neurons` is the number of neurons per ensemble (and per dimension of the
+    circular convolutions), `radar_neurons` the size of the radar, and the
+    dimensionality of the network follows from the vocabularies.
+
+    `memory_bank` packs the color memories into a ColorMemoryBank and
+    `color_gate` latches colors with a ColorGate instead of the basal ganglia
+    and thalamus (see MEMORY_BANK and COLOR_GATE).
+
+    `seed` seeds the random process. Without it, the simulator seeds the
+    process in an order that can change between runs, so runs with the same
+    simulator seed are not reproducible.
+
+    Returns the radar, random, false_input, comparison and done objects.
+    """
+    D = bool_vocab.dimensions
+    with model:
     
-    # Compare desired and actual memory
-    model.comparison = spa.Compare(D, vocab=bool_vocab)
-    nengo.Connection(model.cconv_grbmy.output, model.comparison.inputA)
-    nengo.Connection(model.target.output, model.comparison.inputB)
+        # Use the same neuron model for all ensembles, including those in subnetworks
+        model.config[nengo.Ensemble].neuron_type = NEURON_TYPES[fidelity]
+        
+        
+        ## MOVEMENT ##
+        
+        # Node for random values (filtered noise), to perform random rotations
+        random_process = nengo.processes.FilteredNoise(dist=nengo.dists.Gaussian(0, 0.5), 
+                                                       synapse=nengo.synapses.Alpha(0.1),
+                                                       seed=seed)
+        random = nengo.Node(random_process)
+        
+        # Ensemble that reads sensor and random values
+        radar = nengo.Ensemble(n_neurons=radar_neurons, dimensions=4, radius=4,
+                               neuron_type=nengo.LIFRate() if fidelity == "direct" else nengo.Default)
+        nengo.Connection(radar_input, radar[0:3])
+        nengo.Connection(random, radar[3])
+
+        # Movement function, which outputs (speed, rotation) based on radar values
+        def movement_func(x):
+            left, forward, right, random = x
+            # If random value exceeds thresholds, turn in the corresponding direction
+            if abs(random) > ROTATION_THRESHOLD:
+                rotation = abs(random) - forward/4
+                return 0.1, rotation if random > 0 else -rotation
+            # Otherwise, perform simple wall-avoiding behavior
+            return forward/4, right - left
+        
+        if explorer is None:
+            # Movement function is driven only by radar values
+            nengo.Connection(radar, motor_output, function=movement_func)
+        else:
+            # Movement is driven by the exploration controller (input is the "done" value)
+            def explore(t, x):
+                return explorer.step() if x[0] < 0.5 else (0., 0.)
+            exploration = nengo.Node(explore, size_in=1, size_out=2)
+            nengo.Connection(exploration, motor_output, synapse=None)
+        
+        
+        ## COLOR DETECTION ##
+        
+        # State that outputs the semantic pointer corresponding to the color of the currently occupied cell
+        model.color_recognizer = spa.State(D, vocab=color_vocab)
+        
+        
+        ## COLOR MEMORY ##
+        
+        if memory_bank:
+            # Memories and cleanups for all colors, packed into a single bank (initially storing "FALSE")
+            model.memory = ColorMemoryBank(COLORS, bool_vocab, label="memory")
+            false_input = model.memory.initial_input
+            memories = dict((color, model.memory.outputs[color.lower()][0]) for color in COLORS)
+            memory_inputs = dict((color, model.memory.inputs[color.lower()][0]) for color in COLORS)
+            
+            # Remove "FALSE" and add "TRUE" to a memory when its corresponding color is recognized
+            actions = ['dot(color_recognizer, %s) --> memory_%s=TRUE-FALSE' % (color, color.lower())
+                       for color in COLORS]
+        else:
+            # Memories for all colors (supposed to store TRUE if color encountered, FALSE if not)
+            model.green_memory   = spa.State(D, vocab=bool_vocab, label="green")
+            model.red_memory     = spa.State(D, vocab=bool_vocab, label="red")
+            model.blue_memory    = spa.State(D, vocab=bool_vocab, label="blue")
+            model.magenta_memory = spa.State(D, vocab=bool_vocab, label="magenta")
+            model.yellow_memory  = spa.State(D, vocab=bool_vocab, label="yellow")
+            memories = {"GREEN": model.green_memory.output, "RED": model.red_memory.output,
+                        "BLUE": model.blue_memory.output, "MAGENTA": model.magenta_memory.output,
+                        "YELLOW": model.yellow_memory.output}
+            memory_inputs = {"GREEN": model.green_memory.input, "RED": model.red_memory.input,
+                             "BLUE": model.blue_memory.input, "MAGENTA": model.magenta_memory.input,
+                             "YELLOW": model.yellow_memory.input}
+            
+            # Provide initial pointer "FALSE" to all color memories
+            def initial_false_input(t):
+                return bool_vocab["FALSE"].v.reshape(D) if t < 0.05 else np.zeros(D)
+            false_input = nengo.Node(initial_false_input)
+            nengo.Connection(false_input, model.green_memory.input)
+            nengo.Connection(false_input, model.red_memory.input)
+            nengo.Connection(false_input, model.blue_memory.input)
+            nengo.Connection(false_input, model.yellow_memory.input)
+            nengo.Connection(false_input, model.magenta_memory.input)
+            
+            # Cleanup memories for all color memories (to ensure that they store clean "boolean" pointers)
+            model.green_cleanup   = spa.AssociativeMemory(bool_vocab, wta_output=True, label="clean G")
+            model.red_cleanup     = spa.AssociativeMemory(bool_vocab, wta_output=True, label="clean R")
+            model.blue_cleanup    = spa.AssociativeMemory(bool_vocab, wta_output=True, label="clean B")
+            model.magenta_cleanup = spa.AssociativeMemory(bool_vocab, wta_output=True, label="clean M")
+            model.yellow_cleanup  = spa.AssociativeMemory(bool_vocab, wta_output=True, label="clean Y")
+            nengo.Connection(model.green_memory.output, model.green_cleanup.input, synapse=0.01)
+            nengo.Connection(model.green_cleanup.output, model.green_memory.input, synapse=0.01)
+            nengo.Connection(model.red_memory.output, model.red_cleanup.input, synapse=0.01)
+            nengo.Connection(model.red_cleanup.output, model.red_memory.input, synapse=0.01)
+            nengo.Connection(model.blue_memory.output, model.blue_cleanup.input, synapse=0.01)
+            nengo.Connection(model.blue_cleanup.output, model.blue_memory.input, synapse=0.01)
+            nengo.Connection(model.magenta_memory.output, model.magenta_cleanup.input, synapse=0.01)
+            nengo.Connection(model.magenta_cleanup.output, model.magenta_memory.input, synapse=0.01)
+            nengo.Connection(model.yellow_memory.output, model.yellow_cleanup.input, synapse=0.01)
+            nengo.Connection(model.yellow_cleanup.output, model.yellow_memory.input, synapse=0.01)
+            
+            # Remove "FALSE" and add "TRUE" to a memory when its corresponding color is recognized
+            actions = [
+                'dot(color_recognizer, GREEN)   --> green_memory=TRUE-FALSE',
+                'dot(color_recognizer, RED)     --> red_memory=TRUE-FALSE',
+                'dot(color_recognizer, BLUE)    --> blue_memory=TRUE-FALSE',
+                'dot(color_recognizer, MAGENTA) --> magenta_memory=TRUE-FALSE',
+                'dot(color_recognizer, YELLOW)  --> yellow_memory=TRUE-FALSE',
+            ]
+
+        # Outputs of the color memories, by color (e.g. for probing)
+        model.memory_outputs = memories
+
+        if color_gate:
+            # Gate every recognized color directly into its memory, without action selection
+            model.color_gate = ColorGate(COLORS, color_vocab, bool_vocab, n_neurons=n_neurons,
+                                         label="color gate")
+            nengo.Connection(model.color_recognizer.output, model.color_gate.input)
+            for color in COLORS:
+                nengo.Connection(model.color_gate.outputs[color.lower()][0], memory_inputs[color])
+        else:
+            # Action selection relies on neurons to rectify its values, so it keeps rate neurons in direct mode
+            action_config = nengo.Config(nengo.Ensemble)
+            if fidelity == "direct":
+                action_config[nengo.Ensemble].neuron_type = nengo.LIFRate()
+            with action_config:
+                model.basal_ganglia = spa.BasalGanglia(spa.Actions(*(actions + ['0.5 --> '])))
+                model.thalamus = spa.Thalamus(model.basal_ganglia)
+        
+        
+        ## COUNTING COLORS ##
+        
+        # Convolve all memories together
+        model.cconv_gr    = networks.CircularConvolution(n_neurons, D, label="G*R")
+        model.cconv_bm    = networks.CircularConvolution(n_neurons, D, label="B*M")
+        model.cconv_bmy   = networks.CircularConvolution(n_neurons, D, label="B*M*Y")
+        model.cconv_grbmy = networks.CircularConvolution(n_neurons, D, label="G*R*B*M*Y")
+        nengo.Connection(memories["GREEN"], model.cconv_gr.A)
+        nengo.Connection(memories["RED"], model.cconv_gr.B)
+        nengo.Connection(memories["BLUE"], model.cconv_bm.A)
+        nengo.Connection(memories["MAGENTA"], model.cconv_bm.B)
+        nengo.Connection(model.cconv_bm.output, model.cconv_bmy.A)
+        nengo.Connection(memories["YELLOW"], model.cconv_bmy.B)
+        nengo.Connection(model.cconv_gr.output, model.cconv_grbmy.A)
+        nengo.Connection(model.cconv_bmy.output, model.cconv_grbmy.B)
+         
+        # Specify what the convolved memory looks like when the desired number of colors has been encountered
+        model.target = spa.State(D, vocab=bool_vocab)
+        model.target_input = spa.Input(target = ("*TRUE"*COLORS_TO_FIND)[1:])
+        
+        # Compare desired and actual memory
+        model.comparison = spa.Compare(D, vocab=bool_vocab)
+        nengo.Connection(model.cconv_grbmy.output, model.comparison.inputA)
+        nengo.Connection(model.target.output, model.comparison.inputB)
+        
+        
+        ## STOPPING MOVEMENT ##
+        
+        # Extract the comparison value
+        comparison = nengo.Ensemble(n_neurons,1)
+        nengo.Connection(model.comparison.output, comparison)
+       
+        # Threshold the comparison value, to check if the agent is done
+        done = nengo.Ensemble(n_neurons,1)
+        nengo.Connection(comparison, done, function = lambda x: x > STOP_SIM_THRESHOLD)
+        
+        # Inhibitory connection between "being done" and "moving"
+        nengo.Connection(done, radar.neurons, transform = [[-4]]*radar_neurons)
+        if explorer is not None:
+            nengo.Connection(done, exploration)
+        
+    return radar, random, false_input, comparison, done
+
+
+### SPA MODEL ###
+
+# Settings of a model built by build_model (a config only has to contain the settings that differ)
+DEFAULT_CONFIG = {
+    "map": MAP,
+    "start": (1, 2, 2), # Start position and direction (x, y, dir) of the agent (None for a random free cell)
+    "fidelity": FIDELITY,
+    "exploration": EXPLORATION,
+    "n_neurons": N_NEURONS,
+    "radar_neurons": N_NEURONS*10, # Number of neurons of the radar ensemble
+    "dimensions": D,
+    "memory_bank": MEMORY_BANK,
+    "color_gate": COLOR_GATE,
+    "fused_interface": FUSED_INTERFACE,
+    "seed": None, # Seed of the model, the vocabularies and a random start (None for unseeded)
+}
+
+def build_model(config=None):
+    """Builds a fresh world, agent and SPA model; returns (world, body, model).
+
+    `config` is a dict with settings that override DEFAULT_CONFIG. Nothing is
+    shared between the models returned by separate calls (apart from the
+    vocabularies of unseeded models with dimensionality D), so several models
+    can be built and simulated in one process or in worker processes. With a
+    seed, the neurons, the random process, the vocabularies and a random start
+    are all reproducible.
+
+    The environment and agent interface nodes, the objects returned by
+    `build_critter` and the vocabularies are attached to the model (the
+    comparison ensemble as `model.comparison_value`, as `model.comparison` is
+    the SPA comparison module). With the "fused_interface" setting, the
+    model has an AgentInterface as `model.movement` and no
+    `model.current_color`, so colour_critter.py.cfg does not fit it.
+    """
+    settings = dict(DEFAULT_CONFIG)
+    settings.update(config or {})
+    seed = settings["seed"]
+    if settings["dimensions"] == D and seed is None:
+        vocabs = color_vocab, bool_vocab
+    else:
+        vocabs = make_vocabs(settings["dimensions"], rng=np.random.RandomState(seed))
     
+    ## INITIALIZING WORLD AND AGENT ##
     
-    ## STOPPING MOVEMENT ##
+    world = grid.World(Cell, map=settings["map"], directions=4)
+    body = grid.ContinuousAgent()
+    if len(world.colors()) < COLORS_TO_FIND:
+        raise ValueError("The map has %d colors, fewer than COLORS_TO_FIND (%d)"
+                         % (len(world.colors()), COLORS_TO_FIND))
+    if settings["start"] is None:
+        world.add(body, rng=Random(seed))
+    else:
+        x, y, direction = settings["start"]
+        world.add(body, x=x, y=y, dir=direction)
     
-    # Extract the comparison value
-    comparison = nengo.Ensemble(N_NEURONS,1)
-    nengo.Connection(model.comparison.output, comparison)
-   
-    # Threshold the comparison value, to check if the agent is done
-    done = nengo.Ensemble(N_NEURONS,1)
-    nengo.Connection(comparison, done, function = lambda x: x > STOP_SIM_THRESHOLD)
+    with spa.SPA(seed=seed) as model:
+        model.color_vocab, model.bool_vocab = vocabs
+        
+        ## ENVIRONMENT INITIALIZATION ##
+        
+        # Initialize environment
+        model.env = grid.GridNode(world, dt=0.005)
+        
+        
+        ## AGENT INTERFACE ##
+        
+        if settings["fused_interface"]:
+            # One node moves the agent (input is (speed, rotation)), then outputs
+            # the three wall distances and the color vector of its cell
+            model.movement = nengo.Node(AgentInterface([body], vocabs[0]), size_in=2,
+                                        label="movement")
+            model.stim_radar = nengo.Node(size_in=len(RADAR_ANGLES), label="stim_radar")
+            nengo.Connection(model.movement[:len(RADAR_ANGLES)], model.stim_radar, synapse=None)
+        else:
+            # Node that handles agent movement (input is (speed, rotation))
+            model.movement = nengo.Node(Actuator([body]), size_in=2)
+            
+            # Node for the three wall distance sensors
+            def detect(t):
+                return radar_readings(body)
+            model.stim_radar = nengo.Node(detect)
+        
+        
+        ## CRITTER ##
+        
+        explorer = FrontierExplorer(world, body) if settings["exploration"] else None
+        (model.radar, model.random, model.false_input,
+         model.comparison_value, model.done) = build_critter(
+            model, model.stim_radar, model.movement, fidelity=settings["fidelity"],
+            explorer=explorer, n_neurons=settings["n_neurons"],
+            radar_neurons=settings["radar_neurons"], color_vocab=vocabs[0], bool_vocab=vocabs[1],
+            memory_bank=settings["memory_bank"], color_gate=settings["color_gate"],
+            seed=None if seed is None else np.random.RandomState(seed).randint(2**31))
+        
+        # Provide pointer corresponding to the color of the current cell as input to color recognizer
+        if settings["fused_interface"]:
+            nengo.Connection(model.movement[len(RADAR_ANGLES):], model.color_recognizer.input,
+                             synapse=None)
+        else:
+            def color_pointer(t):
+                return color_name(body)
+            model.current_color = spa.Input(color_recognizer=color_pointer)
     
-    # Inhibitory connection between "being done" and "moving"
-    nengo.Connection(done, radar.neurons, transform = [[-4]]*N_NEURONS*10)
-    
\ No newline at end of file
+    return world, body, model
+
+
+### MODULE-LEVEL MODEL (for nengo_gui) ###
+
+# Only built when run as a script or by nengo_gui, so that importing this file has no side effects
+if __name__ == "__main__" or "nengo_gui" in sys.modules:
+    world, body, model = build_model()
+    env, movement, stim_radar = model.env, model.movement, model.stim_radar
+    radar, random, false_input = model.radar, model.random, model.false_input
+    comparison, done = model.comparison_value, model.done
@@ -0,0 +1,186 @@
+### IMPORTS ###
+
+import argparse
+import collections
+import time
+
+import nengo
+import numpy as np
+from nengo.builder import Builder
+
+from colour_critter import DEFAULT_CONFIG, build_model
+
+
+### CONSTANTS ###
+
+LEAF_TYPES = (nengo.Ensemble, nengo.Node, nengo.Connection, nengo.Probe) # Objects whose build time is measured
+WARMUP_STEPS = 50 # Steps simulated before the calibration
+CALIBRATION_STEPS = 200 # Steps over which the time per step is measured
+
+
+### GROUPING ###
+
+def object_groups(model):
+    """Maps every object of `model` to the subnetwork it belongs to.
+
+    Subnetworks, ensembles and nodes are named after the attribute of the
+    model that refers to them (e.g. `radar`, `green_memory`, `cconv_gr`);
+    unnamed top-level objects fall into "other". Connections belong to the
+    subnetwork of their post object. Returns the mapping and the names of
+    the subnetworks in order of creation.
+    """
+    names = dict((id(value), name) for name, value in vars(model).items()
+                 if isinstance(value, (nengo.Network, nengo.Ensemble, nengo.Node)))
+    owner = {}
+    order = []
+    for network in model.networks:
+        name = names.get(id(network), network.label or "other")
+        order.append(name)
+        for obj in network.all_objects:
+            owner[obj] = name
+    for obj in model.ensembles + model.nodes:
+        owner[obj] = names.get(id(obj), "other")
+        order.append(owner[obj])
+    for conn in model.connections:
+        post = conn.post_obj.ensemble if isinstance(conn.post_obj, nengo.ensemble.Neurons) else conn.post_obj
+        owner[conn] = owner.get(post, "other")
+    for probe in model.probes:
+        owner[probe] = owner.get(probe.obj, "other")
+    return owner, list(collections.OrderedDict.fromkeys(order + ["other"]))
+
+
+class BuildTimer(object):
+    """Context manager that records the build time and the operators of every built object.
+
+    While active, `Builder.build` is wrapped so that the time spent on every
+    ensemble, node, connection and probe ends up in `times`, and every
+    operator added while building it is mapped to it in `op_owner`.
+    """
+
+    def __init__(self):
+        self.times = collections.defaultdict(float)
+        self.op_owner = {}
+        self.depth = 0
+
+    def __enter__(self):
+        self.original = Builder.__dict__["build"]
+        build = self.original.__get__(None, Builder)
+        timer = self
+
+        def timed_build(cls, model, obj, *args, **kwargs):
+            # Objects built by other objects (e.g. connections of probes) count for the outer object
+            if not isinstance(obj, LEAF_TYPES) or timer.depth > 0:
+                return build(model, obj, *args, **kwargs)
+            n_ops = len(model.operators)
+            start = time.time()
+            timer.depth += 1
+            try:
+                return build(model, obj, *args, **kwargs)
+            finally:
+                timer.depth -= 1
+                timer.times[obj] += time.time() - start
+                for op in model.operators[n_ops:]:
+                    timer.op_owner[op] = obj
+
+        Builder.build = classmethod(timed_build)
+        return self
+
+    def __exit__(self, *args):
+        Builder.build = self.original
+
+
+### REPORT ###
+
+def measure_costs(config=None, steps=CALIBRATION_STEPS, dt=0.001):
+    """Builds a model with `build_model(config)` and measures the costs of its subnetworks.
+
+    The simulator is built without operator merging, so that every operator
+    can be traced back to its subnetwork. Returns a dict with one row of
+    costs per subnetwork, the total build time and the time per step.
+    """
+    world, body, model = build_model(config)
+    owner, order = object_groups(model)
+    rows = collections.OrderedDict((name, collections.Counter()) for name in order)
+
+    with BuildTimer() as timer:
+        start = time.time()
+        sim = nengo.Simulator(model, dt=dt, optimize=False, progress_bar=False)
+        build_time = time.time() - start
+
+    def group_of(op):
+        return owner.get(timer.op_owner.get(op), "other")
+
+    for obj, name in owner.items():
+        row = rows[name]
+        row["build_time"] += timer.times.get(obj, 0.)
+        if isinstance(obj, nengo.Ensemble) and obj in model.all_ensembles:
+            row["neurons"] += obj.n_neurons
+        elif isinstance(obj, nengo.Connection) and obj in sim.data:
+            row["connections"] += 1
+            row["weights"] += np.size(sim.data[obj].weights)
+
+    # Memory of the signals, counted once for the subnetwork that uses them first
+    seen = set()
+    for op in sim.model.operators:
+        for signal in op.all_signals:
+            if id(signal.base) not in seen:
+                seen.add(id(signal.base))
+                rows[group_of(op)]["signal_bytes"] += signal.base.nbytes
+
+    # Time per step, then the share of every operator (measured with timed step functions)
+    with sim:
+        sim.run_steps(WARMUP_STEPS, progress_bar=False)
+        start = time.time()
+        sim.run_steps(steps, progress_bar=False)
+        step_time = (time.time() - start) / steps
+
+        op_times = np.zeros(len(sim._steps))
+        def timed(i, step_fn):
+            def step():
+                start = time.time()
+                step_fn()
+                op_times[i] += time.time() - start
+            return step
+        sim._steps = [timed(i, step_fn) for i, step_fn in enumerate(sim._steps)]
+        sim.run_steps(steps, progress_bar=False)
+
+    total = np.sum(op_times)
+    for op, op_time in zip(sim._step_order, op_times):
+        rows[group_of(op)]["step_time"] += step_time * op_time / total
+
+    return {"rows": rows, "build_time": build_time, "step_time": step_time}
+
+
+def report(costs):
+    print("%-20s %8s %6s %10s %12s %10s %10s %7s" % (
+        "subnetwork", "neurons", "conns", "weights", "signals [kB]", "build [s]",
+        "step [us]", "step %"))
+    totals = collections.Counter()
+    for name, row in costs["rows"].items():
+        if not row:
+            continue
+        totals.update(row)
+        print("%-20s %8d %6d %10d %12.1f %10.3f %10.1f %7.1f" % (
+            name, row["neurons"], row["connections"], row["weights"], row["signal_bytes"] / 1e3,
+            row["build_time"], 1e6 * row["step_time"], 100 * row["step_time"] / costs["step_time"]))
+    print("%-20s %8d %6d %10d %12.1f %10.3f %10.1f %7.1f" % (
+        "total", totals["neurons"], totals["connections"], totals["weights"],
+        totals["signal_bytes"] / 1e3, costs["build_time"], 1e6 * costs["step_time"], 100.))
+
+
+### MAIN ###
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report the neurons, memory, build time and step time of every part of the critter.")
+    parser.add_argument("--fidelity", default=DEFAULT_CONFIG["fidelity"], choices=["direct", "rate", "spiking"])
+    parser.add_argument("--dimensions", type=int, default=DEFAULT_CONFIG["dimensions"])
+    parser.add_argument("--neurons", type=int, default=DEFAULT_CONFIG["n_neurons"])
+    parser.add_argument("--radar-neurons", type=int, default=DEFAULT_CONFIG["radar_neurons"])
+    parser.add_argument("--steps", type=int, default=CALIBRATION_STEPS,
+                        help="number of calibration steps")
+    parser.add_argument("--dt", type=float, default=0.001)
+    args = parser.parse_args()
+
+    config = {"fidelity": args.fidelity, "dimensions": args.dimensions, "n_neurons": args.neurons,
+              "radar_neurons": args.radar_neurons}
+    report(measure_costs(config, steps=args.steps, dt=args.dt))
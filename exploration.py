@@ -0,0 +1,117 @@
+### IMPORTS ###
+
+import heapq
+
+import numpy as np
+
+
+### CONSTANTS ###
+
+EXPLORE_SPEED = 0.5 # Speed command while driving towards the frontier (same units as the input of `move`)
+MAX_ROTATION = 1.0 # Largest rotation command of the controller
+
+
+### FRONTIER EXPLORATION ###
+
+class FrontierExplorer(object):
+    """Drives an agent towards the nearest unvisited cell of a grid.World.
+
+    The explorer keeps a mask of visited cells and, for every free cell, the
+    BFS distance to (and the index of) the nearest unvisited cell. When a cell
+    gets visited only the cells that were closest to it are repaired, so the
+    distance map is updated incrementally instead of being recomputed.
+
+    `step` returns a (speed, rotation) command in the same units as the input
+    of the movement node, so it can replace the random walk of the critter.
+    """
+
+    def __init__(self, world, agent, speed=EXPLORE_SPEED, max_rotation=MAX_ROTATION):
+        self.world = world
+        self.agent = agent
+        self.speed = speed
+        self.max_rotation = max_rotation
+
+        width, height = world.width, world.height
+        self.walls = np.zeros((height, width), dtype=bool)
+        for cell in world.iter_cells():
+            self.walls[cell.y, cell.x] = cell.wall
+        self.visited = np.zeros((height, width), dtype=bool)
+
+        # Free neighbours of every cell (by flat index y*width + x)
+        ys, xs = np.mgrid[0:height, 0:width]
+        nx, ny = world.get_neighbour_points(xs.ravel(), ys.ravel())
+        neighbours = ny * width + nx
+        free = ~self.walls.ravel()[neighbours]
+        self.neighbours = [row[mask].tolist() for row, mask in zip(neighbours, free)]
+
+        # Every free cell is unvisited, so it is its own nearest frontier
+        n_cells = width * height
+        self.distance = np.where(self.walls.ravel(), np.inf, 0.0)
+        self.source = np.where(self.walls.ravel(), -1, np.arange(n_cells))
+
+    # Marks a cell as visited and repairs the distance map around it
+    def visit(self, cell):
+        if self.visited[cell.y, cell.x] or self.walls[cell.y, cell.x]:
+            return
+        self.visited[cell.y, cell.x] = True
+        removed = cell.y * self.world.width + cell.x
+
+        # Only cells that had the visited cell as nearest frontier can change
+        affected = np.flatnonzero(self.source == removed)
+        affected_set = set(affected.tolist())
+        self.distance[affected] = np.inf
+        self.source[affected] = -1
+
+        # Restart the search from the unaffected cells around the affected region
+        queue = []
+        for i in affected_set:
+            for j in self.neighbours[i]:
+                if self.source[j] >= 0 and self.distance[j] + 1 < self.distance[i]:
+                    self.distance[i] = self.distance[j] + 1
+                    self.source[i] = self.source[j]
+            if self.source[i] >= 0:
+                queue.append((self.distance[i], i))
+        heapq.heapify(queue)
+        while queue:
+            d, i = heapq.heappop(queue)
+            if d > self.distance[i]:
+                continue
+            for j in self.neighbours[i]:
+                if j in affected_set and d + 1 < self.distance[j]:
+                    self.distance[j] = d + 1
+                    self.source[j] = self.source[i]
+                    heapq.heappush(queue, (d + 1, j))
+
+    # Returns the BFS distance to the nearest unvisited cell for every cell (inf for walls and when done)
+    def distance_map(self):
+        return self.distance.reshape(self.walls.shape)
+
+    # Returns the neighbouring cell that is closest to the frontier (None if nothing is left to explore)
+    def next_cell(self):
+        cell = self.agent.cell
+        here = cell.y * self.world.width + cell.x
+        best = min(self.neighbours[here], key=lambda j: self.distance[j], default=None)
+        if best is None or not np.isfinite(self.distance[best]):
+            return None
+        return self.world.get_cell(best % self.world.width, best // self.world.width)
+
+    def step(self):
+        """Updates the visited cells and returns the (speed, rotation) command towards the frontier."""
+        self.visit(self.agent.cell)
+        target = self.next_cell()
+        if target is None:
+            return 0.0, 0.0
+
+        # Heading error in the direction units of the world (between -directions/2 and directions/2)
+        directions = self.world.directions
+        error = (self.agent.get_direction_to(target) - self.agent.dir + directions / 2.0) % directions
+        error -= directions / 2.0
+
+        # Turn towards the target cell, and only drive when roughly facing it
+        rotation = np.clip(error, -self.max_rotation, self.max_rotation)
+        speed = self.speed * max(0.0, np.cos(error * 2 * np.pi / directions))
+        return speed, rotation
+
+    # Fraction of the free cells that has been visited
+    def coverage(self):
+        return self.visited.sum() / float(max(1, (~self.walls).sum()))
@@ -0,0 +1,126 @@
+### IMPORTS ###
+
+import argparse
+import json
+
+import nengo
+import numpy as np
+
+from colour_critter import DEFAULT_CONFIG, build_model
+from lidar import map_arrays
+
+
+### COVERAGE TRACKING ###
+
+class CoverageTracker(object):
+    """Records how an agent explores its world, incrementally while it moves.
+
+    `update(t)` is called once per time step (see `add_coverage`) and only
+    does work when the agent entered another cell: it then counts the visit
+    in `visits` (entries per cell, indexed [y, x]), and on a first visit
+    extends the coverage curve and, for a colored cell, records the first
+    visit time of that color. Wall contacts are read from `interface`, the
+    Actuator or AgentInterface that moves the agent: every time step in which
+    a wall stopped the agent is one contact, recorded with the time and cell.
+    """
+
+    def __init__(self, world, agent, interface):
+        self.world = world
+        self.agent = agent
+        self.blocked = interface.blocked
+        self.index = interface.agents.index(agent)
+        self.walls = map_arrays(world)[0]
+        self.n_free = int(np.sum(~self.walls))
+        self.visits = np.zeros((world.height, world.width), dtype=np.int32)
+        self.n_visited = 0
+        self.cell = None
+
+        # Coverage (fraction of free cells visited) after every first visit, and first visits per color
+        self.coverage_times = []
+        self.coverage = []
+        self.first_visits = {}
+
+        # Time steps with a refused move, and the cell the agent was in
+        self.contact_times = []
+        self.contact_cells = []
+
+    def update(self, t):
+        if self.blocked[self.index]:
+            self.contact_times.append(t)
+            self.contact_cells.append((self.agent.cell.x, self.agent.cell.y))
+        cell = self.agent.cell
+        if cell is self.cell:
+            return
+        self.cell = cell
+        self.visits[cell.y, cell.x] += 1
+        if self.visits[cell.y, cell.x] == 1:
+            self.n_visited += 1
+            self.coverage_times.append(t)
+            self.coverage.append(self.n_visited / float(max(1, self.n_free)))
+            color = cell.color()
+            if color is not None and color not in self.first_visits:
+                self.first_visits[color] = t
+
+    # Number of entries into already visited cells
+    def revisits(self):
+        return int(np.sum(self.visits)) - self.n_visited
+
+    # Coverage at the given times (the curve is a step function of the first visits)
+    def coverage_at(self, times):
+        i = np.searchsorted(self.coverage_times, times, side="right")
+        return np.concatenate([[0.], self.coverage])[i]
+
+    def summary(self):
+        return {
+            "coverage": self.coverage[-1] if self.coverage else 0.,
+            "visited_cells": self.n_visited,
+            "free_cells": self.n_free,
+            "revisits": self.revisits(),
+            "wall_contacts": len(self.contact_times),
+            "first_visits": dict(self.first_visits),
+        }
+
+    def save(self, path):
+        """Stores the visit counts, coverage curve, wall contacts and first visits in a .npz file."""
+        colors = sorted(self.first_visits)
+        np.savez_compressed(
+            path, visits=self.visits, walls=self.walls,
+            coverage_times=np.array(self.coverage_times), coverage=np.array(self.coverage),
+            contact_times=np.array(self.contact_times),
+            contact_cells=np.array(self.contact_cells, dtype=int).reshape(-1, 2),
+            colors=np.array(colors, dtype=str),
+            first_visits=np.array([self.first_visits[color] for color in colors]))
+
+
+def add_coverage(model, world, agent, label="coverage"):
+    """Adds a node to `model` that updates a CoverageTracker every time step; returns the tracker.
+
+    `model` is built by `build_model` or `build_multi_model`, whose
+    `model.movement` node moves `agent`.
+    """
+    tracker = CoverageTracker(world, agent, model.movement.output)
+    with model:
+        nengo.Node(lambda t: tracker.update(t), size_out=0, label=label)
+    return tracker
+
+
+### MAIN ###
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the critter and report how it explored the world.")
+    parser.add_argument("--time", type=float, default=10.0, help="simulated time (in seconds)")
+    parser.add_argument("--fidelity", default=DEFAULT_CONFIG["fidelity"], choices=["direct", "rate", "spiking"])
+    parser.add_argument("--explore", action="store_true", default=DEFAULT_CONFIG["exploration"],
+                        help="use the frontier exploration controller")
+    parser.add_argument("--seed", type=int, default=DEFAULT_CONFIG["seed"])
+    parser.add_argument("--save", help="store the metrics in this .npz file")
+    args = parser.parse_args()
+
+    world, body, model = build_model({"fidelity": args.fidelity, "exploration": args.explore,
+                                      "seed": args.seed})
+    tracker = add_coverage(model, world, body)
+    with nengo.Simulator(model, seed=args.seed, progress_bar=False) as sim:
+        sim.run(args.time)
+    print(json.dumps(tracker.summary(), indent=2, sort_keys=True))
+    if args.save:
+        tracker.save(args.save)
@@ -0,0 +1,104 @@
+### IMPORTS ###
+
+import argparse
+import time
+
+import grid
+import nengo
+import numpy as np
+
+from colour_critter import Cell, MAP, COLORS, bool_vocab
+from multi_critter import add_critters, build_multi_model
+from termination import add_termination
+
+
+### CONSTANTS ###
+
+FIDELITIES = ("direct", "rate", "spiking") # Neuron models to compare (the last one is the reference)
+START = (1, 2, 2) # Start position and direction of the agent (same as in colour_critter.py)
+SIM_TIME = 10.0 # Simulated time per run (in seconds)
+LATCH_THRESHOLD = 0.5 # Similarity with TRUE above which a color memory counts as latched
+
+
+### RUNNING ONE FIDELITY ###
+
+def run_fidelity(fidelity, sim_time=SIM_TIME, seed=0, dt=0.001):
+    """Runs the critter with the given neuron model and returns its stop time and memory trajectories."""
+    world = grid.World(Cell, map=MAP, directions=4)
+    bodies = add_critters(world, 1, positions=[START])
+    model = build_multi_model(world, bodies, fidelity=fidelity, render=False, seed=seed)
+    critter = model.critters[0]
+    # The stop time is taken from a termination node, so short transients (e.g. in direct mode) are ignored
+    termination = add_termination(model, critter.done, critter.memory_outputs, stop=False)
+    with model:
+        memory_probes = dict((color, nengo.Probe(critter.memory_outputs[color], synapse=0.03))
+                             for color in COLORS)
+
+    start = time.time()
+    with nengo.Simulator(model, dt=dt, seed=seed, progress_bar=False) as sim:
+        build_time = time.time() - start
+        start = time.time()
+        sim.run(sim_time, progress_bar=False)
+        run_time = time.time() - start
+
+    t = sim.trange()
+
+    # Similarity of every memory with TRUE over time
+    memories = dict((color, sim.data[probe].dot(bool_vocab["TRUE"].v))
+                    for color, probe in memory_probes.items())
+
+    return {
+        "fidelity": fidelity,
+        "build_time": build_time,
+        "run_time": run_time,
+        "speed": sim_time / run_time,
+        "stop_time": termination.completion_time,
+        "t": t,
+        "memories": memories,
+    }
+
+
+### COMPARING FIDELITIES ###
+
+# Returns the first time at which a trajectory exceeds the latch threshold (None if it never does)
+def latch_time(t, similarity):
+    above = np.flatnonzero(similarity > LATCH_THRESHOLD)
+    return t[above[0]] if len(above) > 0 else None
+
+def format_time(value):
+    return "-" if value is None else "%.3f" % value
+
+def report(results, reference):
+    """Prints how stop time and memory trajectories of every fidelity differ from the reference."""
+    ref = results[reference]
+
+    print("%-8s %10s %10s %10s %10s %10s" % ("fidelity", "build [s]", "run [s]", "sim/wall",
+                                             "stop [s]", "mem RMSE"))
+    for fidelity, result in results.items():
+        rmse = np.mean([np.sqrt(np.mean((result["memories"][color] - ref["memories"][color])**2))
+                        for color in COLORS])
+        print("%-8s %10.2f %10.2f %10.2f %10s %10.3f" % (fidelity, result["build_time"],
+                                                          result["run_time"], result["speed"],
+                                                          format_time(result["stop_time"]), rmse))
+
+    print("")
+    print("Latch time per color [s] (similarity with TRUE > %.2f)" % LATCH_THRESHOLD)
+    print("%-8s " % "fidelity" + " ".join("%8s" % color for color in COLORS))
+    for fidelity, result in results.items():
+        print("%-8s " % fidelity + " ".join(
+            "%8s" % format_time(latch_time(result["t"], result["memories"][color]))
+            for color in COLORS))
+
+
+### MAIN ###
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the critter across neuron models.")
+    parser.add_argument("--time", type=float, default=SIM_TIME, help="simulated time per run")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the simulator and the random process")
+    parser.add_argument("--fidelities", nargs="+", default=list(FIDELITIES), choices=FIDELITIES)
+    args = parser.parse_args()
+
+    results = dict((fidelity, run_fidelity(fidelity, sim_time=args.time, seed=args.seed))
+                   for fidelity in args.fidelities)
+    report(results, reference=args.fidelities[-1])
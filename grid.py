@@ -5,12 +5,47 @@ import math
 import random
 import sys
 
+import numpy as np
+
 neighbour_synonyms = ('neighbours', 'neighbors', 'neighbour', 'neighbor')
 
+# (dx, dy) for every direction, on even and on odd rows (they only differ on hexagonal grids)
+direction_offsets = {
+    4: (((0, -1), (1, 0), (0, 1), (-1, 0)),) * 2,
+    6: (((1, 0), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1)),
+        ((1, 0), (1, 1), (0, 1), (-1, 0), (0, -1), (1, -1))),
+    8: (((0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1)),) * 2,
+}
+
+
+# Attributes of a cell that do not change its color or wall (so they are not indexed; `__dict__` is
+# swapped by the synchronous update of World.update, which reports the cells that changed itself)
+cell_bookkeeping = ('x', 'y', 'world', 'agents', '_neighbours', '__dict__')
+
+# Attributes of an agent that make up its pose (changes are reported by World.notify_changes)
+agent_pose = ('x', 'y', 'dir', 'cell')
+
+def pose_of(agent):
+    return (getattr(agent, 'x', None), getattr(agent, 'y', None),
+            getattr(agent, 'dir', None), agent.cell)
+
+
+# Attributes of a cell state other than bookkeeping and cached neighbours
+def cell_state(state):
+    return dict((key, val) for key, val in state.items()
+                if key not in cell_bookkeeping and key not in neighbour_synonyms)
+
 
 class Cell(object):
     wall = False
 
+    def __setattr__(self, key, val):
+        object.__setattr__(self, key, val)
+        if key not in cell_bookkeeping:
+            world = self.__dict__.get('world')
+            if world is not None:
+                world.cell_changed(self)
+
     def __getattr__(self, key):
         if key in neighbour_synonyms:
             pts = [self.world.get_point_in_direction(
@@ -22,16 +57,64 @@ class Cell(object):
         raise AttributeError(key)
 
 
+# Agent container shared by all empty CompactCells (replaced by a list when an agent enters the cell)
+EMPTY_AGENTS = ()
+
+class CompactCell(object):
+    """Cell with fixed slots instead of a __dict__, for large worlds.
+
+    Subclasses add `color`, `load` etc. as for Cell, and list the attributes
+    they store in `__slots__` (e.g. `__slots__ = ('cellcolor',)`) to stay
+    compact. The neighbours are cached in a single slot.
+    """
+    __slots__ = ('x', 'y', 'world', 'agents', 'wall', '_neighbours')
+
+    def __init__(self):
+        self.wall = False
+        self._neighbours = None
+
+    def __setattr__(self, key, val):
+        object.__setattr__(self, key, val)
+        if key not in cell_bookkeeping:
+            world = getattr(self, 'world', None)
+            if world is not None:
+                world.cell_changed(self)
+
+    @property
+    def neighbours(self):
+        if self._neighbours is None:
+            pts = [self.world.get_point_in_direction(
+                self.x, self.y, dir) for dir in range(self.world.directions)]
+            self._neighbours = tuple([self.world.grid[y][x] for (x, y) in pts])
+        return self._neighbours
+    neighbors = neighbour = neighbor = neighbours
+
+
+# Names of the slots of a cell class (including those of its base classes)
+def slot_names(cls):
+    names = []
+    for c in reversed(cls.__mro__):
+        slots = c.__dict__.get('__slots__', ())
+        names.extend([slots] if isinstance(slots, str) else slots)
+    return [name for name in names if name not in ('__dict__', '__weakref__')]
+
+
 class Agent(object):
     world = None
     cell = None
 
     def __setattr__(self, key, val):
+        if key in agent_pose:
+            world = self.__dict__.get('world')
+            if world is not None and world.subscribers:
+                world.agent_moved(self)
         if key == 'cell':
             old = self.__dict__.get(key, None)
             if old is not None:
                 old.agents.remove(self)
             if val is not None:
+                if val.agents is EMPTY_AGENTS:
+                    val.agents = []
                 val.agents.append(self)
         self.__dict__[key] = val
 
@@ -115,11 +198,16 @@ class Agent(object):
 
 
 class World(object):
+    updating_cells = False # Set while the cells update synchronously (update reports their changes afterwards)
+
     def __init__(self, cell=None, width=None, height=None, directions=8, filename=None, map=None):
         if cell is None:
             cell = Cell
         self.Cell = cell
         self.directions = directions
+        self.subscribers = []
+        self.offsets = direction_offsets.get(directions)
+        self.offset_table = None if self.offsets is None else np.array(self.offsets)
         if filename or map:
             if filename:
                 data = file(filename).readlines()
@@ -145,17 +233,123 @@ class World(object):
     def get_cell(self, x, y):
         return self.grid[y][x]
 
-    def find_cells(self, filter):
+    # All cells of the world (only the materialised ones for a TiledWorld)
+    def iter_cells(self):
         for row in self.grid:
             for cell in row:
-                if filter(cell):
-                    yield cell
+                yield cell
+
+    def find_cells(self, filter):
+        for cell in self.iter_cells():
+            if filter(cell):
+                yield cell
+
+    # Cells of the given color (as returned by Cell.color; walls excluded), without scanning the grid
+    def cells_with_color(self, color):
+        if self.color_index is None:
+            self.build_index()
+        points = sorted(self.color_index.get(color, ()), key=lambda p: (p[1], p[0]))
+        return [self.grid[y][x] for (x, y) in points]
+
+    def wall_cells(self):
+        if self.color_index is None:
+            self.build_index()
+        return [self.grid[y][x] for (x, y) in sorted(self.wall_index, key=lambda p: (p[1], p[0]))]
+
+    # Colors that occur on the map (walls and cells without color excluded)
+    def colors(self):
+        if self.color_index is None:
+            self.build_index()
+        return sorted(self.color_index)
+
+    # Index from color to the coordinates of its cells, and the coordinates of all walls
+    # (built by load, or on the first lookup, and kept current by cell_changed)
+    def build_index(self):
+        self.color_index = {}
+        self.wall_index = set()
+        self._indexed_colors = {}
+        for cell in self.iter_cells():
+            self.cell_changed(cell)
+
+    # Keeps the index current after an attribute of `cell` changed (and records the change for the subscribers)
+    def cell_changed(self, cell):
+        if self.updating_cells:
+            return
+        if self.subscribers and self.changed_cells is not None:
+            self.changed_cells.add((cell.x, cell.y))
+        if self.color_index is None:
+            return
+        point = (cell.x, cell.y)
+        old = self._indexed_colors.pop(point, None)
+        if old is not None:
+            self.color_index[old].discard(point)
+            if not self.color_index[old]:
+                del self.color_index[old]
+        if getattr(cell, 'wall', False):
+            self.wall_index.add(point)
+            return
+        self.wall_index.discard(point)
+        color = getattr(cell, 'color', None)
+        if callable(color):
+            try:
+                color = color()
+            except AttributeError:
+                color = None
+        if color is not None:
+            self._indexed_colors[point] = color
+            self.color_index.setdefault(color, set()).add(point)
+
+    # Records the pose of `agent` before it changes (only the first change between two notifications counts)
+    def agent_moved(self, agent):
+        if agent not in self.moved_agents:
+            self.moved_agents[agent] = pose_of(agent)
+
+    ## CHANGE NOTIFICATION ##
+
+    def subscribe(self, callback):
+        """Calls `callback(world, cells, agents)` on every `notify_changes` that has changes to report.
+
+        `cells` is the set of (x, y) coordinates of the cells whose attributes
+        changed since the last notification, or None if the whole map changed
+        (after `reset` or `load`); `agents` is the list of agents whose pose
+        (x, y, dir or cell) changed, or that were added or removed. Changes are
+        only recorded while there are subscribers, so a new subscriber starts
+        from the current state of the world. Returns `callback`.
+        """
+        if not self.subscribers and self.changed_cells is None:
+            self.changed_cells = set()
+        self.subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    def notify_changes(self):
+        """Reports the changes since the last call to all subscribers, and starts recording anew.
+
+        Called at the end of `update`, and once per time step by the nodes that
+        move agents, so the subscribers see one set of changes per step.
+        """
+        cells, self.changed_cells = self.changed_cells, set()
+        moved, self.moved_agents = self.moved_agents, {}
+        # Agents whose pose was changed and then restored (e.g. by detect) did not move
+        agents = [agent for agent, pose in moved.items()
+                  if agent.world is not self or pose_of(agent) != pose]
+        if cells is None or cells or agents:
+            for callback in list(self.subscribers):
+                callback(self, cells, agents)
 
     def reset(self):
+        self.changed_cells = None
+        self.moved_agents = {}
+        self.color_index = None
         self.grid = [[self._make_cell(
             i, j) for i in range(self.width)] for j in range(self.height)]
-        self.dictBackup = [[{} for i in range(self.width)]
-                           for j in range(self.height)]
+        # Backups of the cell states for synchronous updates, only needed if cells update themselves
+        self.dictBackup = None
+        if hasattr(self.Cell, 'update'):
+            self.dictBackup = [[{} for i in range(self.width)]
+                               for j in range(self.height)]
         self.agents = []
         self.age = 0
 
@@ -164,7 +358,7 @@ class World(object):
         c.x = x
         c.y = y
         c.world = self
-        c.agents = []
+        c.agents = EMPTY_AGENTS if isinstance(c, CompactCell) else []
         return c
 
     def randomize(self):
@@ -222,19 +416,34 @@ class World(object):
             line = lines[j]
             for i in range(min(fw, len(line))):
                 self.grid[starty + j][startx + i].load(line[i])
+        self.build_index()
 
     def update(self):
-        if hasattr(self.Cell, 'update'):
-            for j, row in enumerate(self.grid):
-                for i, c in enumerate(row):
-                    self.dictBackup[j][i].update(c.__dict__)
-                    c.update()
-                    c.__dict__, self.dictBackup[j][
-                        i] = self.dictBackup[j][i], c.__dict__
+        if hasattr(self.Cell, 'update') and not hasattr(self.grid[0][0], '__dict__'):
+            self._update_slots()
+            for a in self.agents:
+                a.update()
+        elif hasattr(self.Cell, 'update'):
+            self.updating_cells = True
+            try:
+                for j, row in enumerate(self.grid):
+                    for i, c in enumerate(row):
+                        self.dictBackup[j][i].update(c.__dict__)
+                        c.update()
+                        c.__dict__, self.dictBackup[j][
+                            i] = self.dictBackup[j][i], c.__dict__
+                for j, row in enumerate(self.grid):
+                    for i, c in enumerate(row):
+                        c.__dict__, self.dictBackup[j][
+                            i] = self.dictBackup[j][i], c.__dict__
+            finally:
+                self.updating_cells = False
+            # Only the cells whose state differs from the old one (now in the backup) changed
             for j, row in enumerate(self.grid):
                 for i, c in enumerate(row):
-                    c.__dict__, self.dictBackup[j][
-                        i] = self.dictBackup[j][i], c.__dict__
+                    old = self.dictBackup[j][i]
+                    if c.__dict__ != old and cell_state(c.__dict__) != cell_state(old):
+                        self.cell_changed(c)
             for a in self.agents:
                 a.update()
         else:
@@ -242,22 +451,34 @@ class World(object):
                 oldCell = a.cell
                 a.update()
         self.age += 1
+        self.notify_changes()
+
+    # Synchronous update of cells without a __dict__: every cell updates from the old states
+    def _update_slots(self):
+        names = [n for n in slot_names(self.Cell) if n != '_neighbours']
+        old_states, new_states = [], []
+        self.updating_cells = True
+        try:
+            for row in self.grid:
+                for c in row:
+                    old = [getattr(c, n, None) for n in names]
+                    c.update()
+                    old_states.append(old)
+                    new_states.append([getattr(c, n, None) for n in names])
+                    for n, v in zip(names, old):
+                        setattr(c, n, v)
+            for c, state in zip([c for row in self.grid for c in row], new_states):
+                for n, v in zip(names, state):
+                    setattr(c, n, v)
+        finally:
+            self.updating_cells = False
+        # Only the cells whose state differs from the old one changed
+        for c, old, new in zip([c for row in self.grid for c in row], old_states, new_states):
+            if old != new:
+                self.cell_changed(c)
 
     def get_offset_in_direction(self, x, y, dir):
-        if self.directions == 8:
-            dx, dy = [(0, -1), (1, -1), (
-                1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1)][dir]
-        elif self.directions == 4:
-            dx, dy = [(0, -1), (1, 0), (0, 1), (-1, 0)][dir]
-        elif self.directions == 6:
-            if y % 2 == 0:
-                dx, dy = [(1, 0), (0, 1), (-1, 1), (-1, 0),
-                          (-1, -1), (0, -1)][dir]
-            else:
-                dx, dy = [(1, 0), (1, 1), (0, 1), (-1, 0),
-                          (0, -1), (1, -1)][dir]
-        return dx, dy
-
+        return self.offsets[y % 2][dir]
 
     def get_point_in_direction(self, x, y, dir):
         dx, dy = self.get_offset_in_direction(x, y, dir)
@@ -276,12 +497,34 @@ class World(object):
 
         return (x2, y2)
 
+    # Array versions of the above: x, y and dir are (broadcastable) integer arrays
+    def get_offsets_in_directions(self, x, y, dir):
+        offsets = self.offset_table[np.asarray(y, dtype=int) % 2, np.asarray(dir, dtype=int)]
+        return offsets[..., 0], offsets[..., 1]
+
+    def get_points_in_directions(self, x, y, dir):
+        x = np.asarray(x, dtype=int)
+        y = np.asarray(y, dtype=int)
+        dx, dy = self.get_offsets_in_directions(x, y, dir)
+        return (x + dx) % self.width, (y + dy) % self.height
+
+    # Coordinates of all neighbours of the given points (with an extra last axis for the direction)
+    def get_neighbour_points(self, x, y):
+        x = np.asarray(x, dtype=int)[..., None]
+        y = np.asarray(y, dtype=int)[..., None]
+        return self.get_points_in_directions(x, y, np.arange(self.directions))
+
     def remove(self, agent):
+        if self.subscribers:
+            self.agent_moved(agent)
         self.agents.remove(agent)
         agent.world = None
         agent.cell = None
 
-    def add(self, agent, x=None, y=None, cell=None, dir=None):
+    # `rng` (a random.Random, by default the random module) picks missing coordinates and direction
+    def add(self, agent, x=None, y=None, cell=None, dir=None, rng=None):
+        if rng is None:
+            rng = random
         self.agents.append(agent)
         if x is not None and y is not None:
             cell = self.grid[y][x]
@@ -290,9 +533,9 @@ class World(object):
                 xx = x
                 yy = y
                 if xx is None:
-                    xx = random.randrange(self.width)
+                    xx = rng.randrange(self.width)
                 if yy is None:
-                    yy = random.randrange(self.height)
+                    yy = rng.randrange(self.height)
                 if not getattr(self.grid[yy][xx], 'wall', False):
                     y = yy
                     x = xx
@@ -302,7 +545,7 @@ class World(object):
             y = cell.y
 
         if dir is None:
-            dir = random.randrange(self.directions)
+            dir = rng.randrange(self.directions)
 
         agent.cell = self.grid[y][x]
         agent.dir = dir
@@ -314,6 +557,124 @@ class World(object):
 class CellularException(Exception):
     pass
 
+
+class LazyRow(object):
+    """Row of a TiledWorld, so that `world.grid[y][x]` materialises the tile of the cell."""
+
+    def __init__(self, world, y):
+        self.world = world
+        self.y = y
+
+    def __getitem__(self, x):
+        return self.world.get_cell(x % self.world.width, self.y)
+
+    def __len__(self):
+        return self.world.width
+
+    def __iter__(self):
+        return (self[x] for x in range(len(self)))
+
+
+class LazyGrid(object):
+    def __init__(self, world):
+        self.world = world
+
+    def __getitem__(self, y):
+        return LazyRow(self.world, y % self.world.height)
+
+    def __len__(self):
+        return self.world.height
+
+    def __iter__(self):
+        return (self[y] for y in range(len(self)))
+
+
+class TiledWorld(World):
+    """World whose cells are created one square tile at a time, when a cell of the tile is first accessed.
+
+    Loading a map only materialises the tiles that contain a character other
+    than `default` (empty floor); all other tiles share the implicit default
+    state and use no memory until an agent, a sensor or the code accesses
+    them through `get_cell` or `grid[y][x]`. New cells are loaded with
+    `default`. Iterating (`iter_cells`, `find_cells`, the color index and
+    rendering) only visits materialised cells, so cells that are never
+    materialised must look like `default` (no wall, no color). Cells that
+    update themselves are not supported.
+    """
+
+    def __init__(self, cell=None, width=None, height=None, directions=8, filename=None, map=None,
+                 tile_size=16, default=' '):
+        self.tile_size = tile_size
+        self.default = default
+        World.__init__(self, cell, width=width, height=height, directions=directions,
+                       filename=filename, map=map)
+
+    def reset(self):
+        if hasattr(self.Cell, 'update'):
+            raise CellularException('TiledWorld does not support cells with update')
+        self.changed_cells = None
+        self.moved_agents = {}
+        self.color_index = None
+        self.tiles = {}
+        self.grid = LazyGrid(self)
+        self.dictBackup = None
+        self.agents = []
+        self.age = 0
+
+    # Tile (a list of rows of cells) at tile coordinates (tx, ty), created on first access
+    def get_tile(self, tx, ty):
+        tile = self.tiles.get((tx, ty))
+        if tile is None:
+            size = self.tile_size
+            tile = [[self._make_cell(x, y)
+                     for x in range(tx * size, min((tx + 1) * size, self.width))]
+                    for y in range(ty * size, min((ty + 1) * size, self.height))]
+            self.tiles[(tx, ty)] = tile
+            self.init_tile(tile)
+        return tile
+
+    # Gives the cells of a new tile their initial state
+    def init_tile(self, tile):
+        if hasattr(self.Cell, 'load'):
+            for row in tile:
+                for cell in row:
+                    cell.load(self.default)
+
+    def get_cell(self, x, y):
+        size = self.tile_size
+        return self.get_tile(x // size, y // size)[y % size][x % size]
+
+    def iter_cells(self):
+        for tile in list(self.tiles.values()):
+            for row in tile:
+                for cell in row:
+                    yield cell
+
+    def load(self, filename=None, map=None):
+        if not hasattr(self.Cell, 'load'):
+            return
+        if filename:
+            if isinstance(filename, type('')):
+                filename = open(filename)
+            lines = filename.readlines()
+        else:
+            lines = map.splitlines()
+            if len(lines[0]) == 0:
+                del lines[0]
+        lines = [x.rstrip() for x in lines]
+        fh = min(len(lines), self.height)
+        fw = min(max([len(x) for x in lines]), self.width)
+        starty = int((self.height - fh) / 2)
+        startx = int((self.width - fw) / 2)
+
+        self.reset()
+        for j in range(fh):
+            line = lines[j]
+            for i in range(min(fw, len(line))):
+                if line[i] != self.default:
+                    self.get_cell(startx + i, starty + j).load(line[i])
+        self.build_index()
+
 	
 class ContinuousAgent(Agent):
     def go_in_direction(self, dir, distance=1, return_obstacle=False):
@@ -402,29 +763,59 @@ import nengo
 # GridNode sets up the pacman world for visualization
 class GridNode(nengo.Node):
     def __init__(self, world, dt=0.001):
+        # Rendered cells by coordinates (None to render all cells again), updated
+        # from the changes reported by the world, and whether the SVG is outdated
+        self.cell_rects = None
+        self.cells_svg = None
+        self.outdated = True
+        world.subscribe(self.world_changed)
 
         # The initalizer sets up the html layout for display
         def svg(t):
             last_t = getattr(svg, '_nengo_html_t_', None)
             if last_t is None or t >= last_t + dt or t <= last_t:
-                svg._nengo_html_ = self.generate_svg(world)
+                world.notify_changes()
+                if self.outdated or last_t is None:
+                    svg._nengo_html_ = self.generate_svg(world)
+                    self.outdated = False
                 svg._nengo_html_t_ = t
         super(GridNode, self).__init__(svg)
 
+    # Re-renders only the cells that changed; moved agents only make the SVG outdated
+    def world_changed(self, world, cells, agents):
+        if cells is None:
+            self.cell_rects = None
+        elif cells and self.cell_rects is not None:
+            for x, y in cells:
+                rect = self.cell_rect(world.get_cell(x, y))
+                if rect is None:
+                    self.cell_rects.pop((x, y), None)
+                else:
+                    self.cell_rects[(x, y)] = rect
+        if cells is None or cells:
+            self.cells_svg = None
+        self.outdated = True
+
+    def cell_rect(self, cell):
+        color = getattr(cell, 'color', None)
+        if callable(color):
+            color = color()
+        if color is not None:
+            return ('<rect x=%d y=%d width=1 height=1 style="fill:%s"/>' %
+                    (cell.x, cell.y, color))
+
     # This function sets up an SVG (used to embed html code in the environment)
     def generate_svg(self, world):
-        cells = []
-        # Runs through every cell in the world (walls & food)
-        for i in range(world.width):
-            for j in range(world.height):
-                cell = world.get_cell(i, j)
-                color = cell.color
-                if callable(color):
-                    color = color()
-
-                if color is not None:
-                    cells.append('<rect x=%d y=%d width=1 height=1 style="fill:%s"/>' %
-                         (i, j, color))
+        # Runs through every (materialised) cell in the world (walls & food), unless they are cached
+        if self.cell_rects is None:
+            self.cell_rects = {}
+            for cell in world.iter_cells():
+                rect = self.cell_rect(cell)
+                if rect is not None:
+                    self.cell_rects[(cell.x, cell.y)] = rect
+            self.cells_svg = None
+        if self.cells_svg is None:
+            self.cells_svg = ''.join(self.cell_rects.values())
 
         # Runs through every agent in the world
         agents = []
@@ -456,6 +847,6 @@ class GridNode(nengo.Node):
             %s
             %s
             </svg>''' % (world.width, world.height,
-                         ''.join(cells), ''.join(agents))
+                         self.cells_svg, ''.join(agents))
         return svg
 	
@@ -0,0 +1,151 @@
+### IMPORTS ###
+
+import nengo
+import numpy as np
+
+from colour_critter import RADAR_RANGE
+
+
+### CONSTANTS ###
+
+N_BEAMS = 32 # Default number of beams
+FIELD_OF_VIEW = 1.0 # Default angle covered by the beams (in grid directions, as RADAR_ANGLES; 4 is a full turn on a 4-direction grid)
+RESOLUTION = 1.0 / 64 # Distance between the points sampled along a beam (the finest step of ContinuousAgent.detect)
+NO_COLOR = -1 # Color code of a beam that crosses no colored cell before it hits a wall (or within range)
+
+
+### RAYCASTING ###
+
+# Wall mask and color codes of all cells of a world (indexed [y, x]; cells a TiledWorld never created are empty)
+def map_arrays(world):
+    walls = np.zeros((world.height, world.width), dtype=bool)
+    colors = np.zeros((world.height, world.width), dtype=int)
+    for cell in world.iter_cells():
+        walls[cell.y, cell.x] = cell.wall
+        colors[cell.y, cell.x] = getattr(cell, "cellcolor", 0)
+    return walls, colors
+
+# Step in the grid for every (fractional) direction, interpolated between direction offsets as in go_in_direction
+def direction_steps(world, y, directions):
+    directions = np.asarray(directions, dtype=float) % world.directions
+    dir1 = directions.astype(int)
+    dir2 = (dir1 + 1) % world.directions
+    dx1, dy1 = world.get_offsets_in_directions(0, y, dir1)
+    dx2, dy2 = world.get_offsets_in_directions(0, y, dir2)
+    scale = directions % 1
+    return np.stack([dx2 * scale + dx1 * (1 - scale), dy2 * scale + dy1 * (1 - scale)], -1)
+
+def cast_rays(walls, colors, x, y, offsets, steps, max_distance, index=None):
+    """Returns the distance to the first wall and the color code of the first colored cell along a batch of rays.
+
+    Ray i starts at (x[i], y[i]) and is sampled at `steps` times its grid step
+    `offsets[i]`. `walls` and `colors` are the arrays of `map_arrays`, or
+    stacks of them with one map per ray selected by `index`. Rays that do not
+    hit a wall within `max_distance` return `max_distance`. The color code is
+    that of the first colored cell the ray crosses before the wall (walls
+    have no color), not counting the start cell; rays that cross none return
+    NO_COLOR.
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    height, width = walls.shape[-2:]
+    xs = x.reshape(-1, 1) + offsets[:, 0:1] * steps
+    ys = y.reshape(-1, 1) + offsets[:, 1:2] * steps
+
+    # Cell closest to every sampled point (points outside the world count as walls)
+    cx = np.floor(xs + 0.5).astype(int)
+    cy = np.floor(ys + 0.5).astype(int)
+    inside = (cx >= 0) & (cx < width) & (cy >= 0) & (cy < height)
+    cx, cy = np.clip(cx, 0, width - 1), np.clip(cy, 0, height - 1)
+    maps = () if index is None else (np.asarray(index).reshape(-1, 1),)
+    hits = walls[maps + (cy, cx)] | ~inside
+    codes = np.where(inside, colors[maps + (cy, cx)], 0)
+
+    # Distance to the last free point before the first hit of every ray
+    hit = hits.any(axis=1)
+    first = np.argmax(hits, axis=1)
+    last_free = np.where(first > 0, steps[np.maximum(first - 1, 0)], 0.)
+    distances = np.where(hit, last_free * np.linalg.norm(offsets, axis=1), max_distance)
+
+    # Color of the first colored cell before the hit, leaving out the start cell of every ray
+    before_hit = np.arange(len(steps)) < np.where(hit, first, len(steps)).reshape(-1, 1)
+    start = ((cx == np.floor(x + 0.5).astype(int).reshape(-1, 1)) &
+             (cy == np.floor(y + 0.5).astype(int).reshape(-1, 1)))
+    colored = (codes != 0) & before_hit & ~start
+    rays = np.arange(len(offsets))
+    codes = np.where(colored.any(axis=1), codes[rays, np.argmax(colored, axis=1)], NO_COLOR)
+    return distances, codes
+
+
+### LIDAR ###
+
+class Lidar(object):
+    """Casts several beams from an agent at once, as a batched version of ContinuousAgent.detect.
+
+    The beams are spread evenly over `field_of_view` (in grid directions,
+    centred on the agent's direction) and reach at most `max_distance`. All
+    beams are sampled at RESOLUTION in one NumPy operation, looking up walls
+    and cell colors in arrays built from the world. Every beam reports the
+    distance to the wall it hits and the color of the first colored cell it
+    crosses on the way. The arrays follow the
+    cell changes the world reports (see World.subscribe); `update_map`
+    rebuilds them from scratch.
+
+    A point belongs to the closest cell of the whole grid, so unlike `detect`
+    (which only considers the four neighbours of the current cell) a beam
+    cannot slip between two walls that touch at a corner.
+    """
+
+    def __init__(self, world, n_beams=N_BEAMS, field_of_view=FIELD_OF_VIEW,
+                 max_distance=RADAR_RANGE, resolution=RESOLUTION):
+        self.world = world
+        self.max_distance = max_distance
+        self.steps = np.arange(1, int(np.ceil(max_distance / resolution)) + 1) * resolution
+
+        # Beam angles relative to the agent (without a duplicate beam when they cover a full turn)
+        full_turn = field_of_view >= world.directions
+        self.angles = np.linspace(-field_of_view / 2., field_of_view / 2., n_beams,
+                                  endpoint=not full_turn) if n_beams > 1 else np.zeros(1)
+        self.update_map()
+        world.subscribe(self.map_changed)
+
+    # Rebuilds the wall mask and color codes from the cells of the world
+    def update_map(self):
+        self.walls, self.colors = map_arrays(self.world)
+
+    # Updates the arrays at the cells that changed
+    def map_changed(self, world, cells, agents):
+        if cells is None:
+            self.update_map()
+            return
+        for x, y in cells:
+            cell = world.get_cell(x, y)
+            self.walls[y, x] = cell.wall
+            self.colors[y, x] = getattr(cell, "cellcolor", 0)
+
+    # Unit steps of all beams in the grid
+    def beam_offsets(self, agent):
+        return direction_steps(self.world, agent.cell.y, self.angles + agent.dir)
+
+    def scan(self, agent):
+        """Returns the distance to the nearest wall and the first color code seen for every beam.
+
+        Beams that do not hit a wall within range return `max_distance`, and
+        beams that cross no colored cell (other than the agent's own) before
+        the wall return color code NO_COLOR.
+        """
+        return cast_rays(self.walls, self.colors, agent.x, agent.y, self.beam_offsets(agent),
+                         self.steps, self.max_distance)
+
+
+class LidarNode(nengo.Node):
+    """Node that outputs the distances of all lidar beams of an agent, followed by the first color code each beam sees."""
+
+    def __init__(self, agent, lidar, label="lidar"):
+        self.agent = agent
+        self.lidar = lidar
+
+        def scan(t):
+            distances, codes = lidar.scan(agent)
+            return np.concatenate([distances, codes])
+
+        super(LidarNode, self).__init__(scan, size_out=2 * len(lidar.angles), label=label)
@@ -0,0 +1,96 @@
+### IMPORTS ###
+
+import nengo
+import numpy as np
+from nengo.networks import EnsembleArray
+from nengo.networks.assoc_mem import filtered_step
+from nengo.spa.module import Module
+
+
+### MEMORY BANK ###
+
+class ColorMemoryBank(Module):
+    """Boolean memories for a list of colors, including their cleanup memories.
+
+    Behaves like one spa.State with a spa.AssociativeMemory (wta_output=True)
+    cleanup loop per color: the cleanup ensembles have the same exponential
+    intercepts, the same bias of -threshold and the same filtered step output
+    as the ensembles of the associative memory. But all memories share one
+    EnsembleArray and all cleanups share a second one. The memory -> cleanup -> memory loop, the
+    winner-take-all inhibition and the initial pointer are each a single
+    block-diagonal connection, so the number of ensembles and connections of
+    the memories does not grow with the number of colors.
+
+    Every color is available as SPA input and output named after the color,
+    so actions can refer to it as `<module name>_<color>` (e.g. `memory_green`).
+    """
+
+    def __init__(self, colors, vocab, initial="FALSE", subdimensions=16,
+                 neurons_per_dimension=50, cleanup_neurons=50, threshold=0.3,
+                 inhibit_scale=3.0, synapse=0.01, label=None, seed=None,
+                 add_to_container=None):
+        super(ColorMemoryBank, self).__init__(label, seed, add_to_container)
+
+        self.colors = [color.lower() for color in colors]
+        n_colors = len(self.colors)
+        D = vocab.dimensions
+        if D % subdimensions != 0:
+            raise ValueError("Dimensions (%d) must be divisible by subdimensions (%d)"
+                             % (D, subdimensions))
+
+        # Pointers stored by every cleanup, one row per item
+        items = vocab.vectors
+        n_items = len(items)
+        blocks = np.eye(n_colors)
+
+        with self:
+            # Memories for all colors (one block of D dimensions per color)
+            self.memories = EnsembleArray(neurons_per_dimension * subdimensions,
+                                          n_colors * D // subdimensions,
+                                          ens_dimensions=subdimensions,
+                                          radius=np.sqrt(float(subdimensions) / D),
+                                          label="memories")
+
+            # Cleanups for all colors (one ensemble per color and vocabulary item, configured
+            # as in nengo.networks.AssociativeMemory)
+            self.cleanups = EnsembleArray(cleanup_neurons, n_colors * n_items,
+                                          intercepts=nengo.dists.Exponential(0.15, 0., 1.),
+                                          encoders=nengo.dists.Choice([[1]]),
+                                          eval_points=nengo.dists.Uniform(0., 1.),
+                                          n_eval_points=5000, label="cleanups")
+            self.bias = nengo.Node(1, label="bias")
+            nengo.Connection(self.bias, self.cleanups.input,
+                             transform=-threshold * np.ones((n_colors * n_items, 1)), synapse=None)
+            cleaned = self.cleanups.add_output("step", lambda x: filtered_step(x, 0., scale=15))
+
+            # Memory -> cleanup -> memory loop for all colors at once
+            nengo.Connection(self.memories.output, self.cleanups.input,
+                             transform=np.kron(blocks, items), synapse=synapse)
+            nengo.Connection(cleaned, self.memories.input,
+                             transform=np.kron(blocks, items.T), synapse=synapse)
+
+            # Winner-take-all between the items of each cleanup
+            nengo.Connection(cleaned, self.cleanups.input,
+                             transform=np.kron(blocks, (np.eye(n_items) - 1) * inhibit_scale),
+                             synapse=0.005)
+
+            # Provide the initial pointer to all memories
+            self.initial_input = None
+            if initial is not None:
+                initial_vector = np.tile(vocab[initial].v, n_colors)
+                def initial_pointer(t):
+                    return initial_vector if t < 0.05 else np.zeros(n_colors * D)
+                self.initial_input = nengo.Node(initial_pointer, label="initial")
+                nengo.Connection(self.initial_input, self.memories.input)
+
+            self.input = self.memories.input
+            self.output = self.memories.output
+
+            # Input and output node for every color (SPA modules cannot expose slices)
+            for i, color in enumerate(self.colors):
+                color_input = nengo.Node(size_in=D, label="%s input" % color)
+                color_output = nengo.Node(size_in=D, label=color)
+                nengo.Connection(color_input, self.input[i*D:(i+1)*D], synapse=None)
+                nengo.Connection(self.output[i*D:(i+1)*D], color_output, synapse=None)
+                self.inputs[color] = (color_input, vocab)
+                self.outputs[color] = (color_output, vocab)
@@ -0,0 +1,134 @@
+### IMPORTS ###
+
+import sys
+
+import grid
+import nengo
+import numpy as np
+import nengo.spa as spa
+
+from colour_critter import (Cell, MAP, N_NEURONS, FIDELITY, EXPLORATION, MEMORY_BANK, COLOR_GATE,
+                            FUSED_INTERFACE, color_vocab, bool_vocab, Actuator, AgentInterface,
+                            radar_readings, color_name, build_critter)
+from exploration import FrontierExplorer
+
+
+### CONSTANTS ###
+
+N_CRITTERS = 3 # Number of critters that share the world
+
+
+### INITIALIZING WORLD AND AGENTS ###
+
+# Creates one agent per start position (a start position of None places the agent randomly)
+def add_critters(world, n_critters, positions=None):
+    if positions is None:
+        positions = [None] * n_critters
+    bodies = []
+    for pos in positions:
+        body = grid.ContinuousAgent()
+        if pos is None:
+            world.add(body)
+        else:
+            x, y, direction = pos
+            world.add(body, x=x, y=y, dir=direction)
+        bodies.append(body)
+    return bodies
+
+
+### MULTI-CRITTER MODEL ###
+
+def build_multi_model(world, bodies, fidelity=FIDELITY, exploration=EXPLORATION,
+                      n_neurons=N_NEURONS, radar_neurons=N_NEURONS*10, color_vocab=color_vocab,
+                      bool_vocab=bool_vocab, memory_bank=MEMORY_BANK, color_gate=COLOR_GATE,
+                      fused_interface=FUSED_INTERFACE, render=True, seed=None):
+    """Builds one model in which every agent in `bodies` is driven by its own critter network.
+
+    All agents are read and moved by a single vectorised sensor node (3 radar
+    values per critter, `stim_radar`), a single motor node (2 commands per
+    critter, `movement`) and a single color node (one D-dimensional pointer
+    per critter, `color_input`), as in `build_model`. With
+    `fused_interface`, a single AgentInterface node moves and then reads all
+    agents instead, and its output is split over passthrough nodes
+    `stim_radar` and `color_input` (the critters then sense one step earlier,
+    see AgentInterface). The per-critter
+    networks are replicated with `build_critter` (using the given neuron
+    `fidelity`, and with a FrontierExplorer per agent if `exploration` is
+    set) and can be found in `model.critters`, each with its `radar`
+    and `done` ensembles attached. Without `render`, the model has no GridNode
+    (for runs outside nengo_gui, where drawing the world every 5 ms only costs
+    time and memory). `seed` seeds the random processes of the critters, so
+    that runs with the same simulator seed are reproducible. The remaining arguments are passed on to `build_critter`.
+    """
+    n = len(bodies)
+    D = color_vocab.dimensions
+
+    with nengo.Network(label="critters") as model:
+
+        ## ENVIRONMENT INITIALIZATION ##
+
+        if render:
+            model.env = grid.GridNode(world, dt=0.005)
+
+
+        ## AGENT INTERFACE ##
+
+        if fused_interface:
+            # Node that moves all agents (input is (speed, rotation) for every critter), then
+            # outputs the wall distances and the color pointer of every agent
+            model.movement = nengo.Node(AgentInterface(bodies, color_vocab), size_in=2*n)
+            model.stim_radar = nengo.Node(size_in=3*n)
+            model.color_input = nengo.Node(size_in=D*n)
+            for i in range(n):
+                start = (3+D)*i
+                nengo.Connection(model.movement[start:start+3], model.stim_radar[3*i:3*i+3],
+                                 synapse=None)
+                nengo.Connection(model.movement[start+3:start+3+D],
+                                 model.color_input[D*i:D*(i+1)], synapse=None)
+        else:
+            # Node that moves all agents (input is (speed, rotation) for every critter)
+            model.movement = nengo.Node(Actuator(bodies), size_in=2*n)
+
+            # Node for the wall distance sensors of all agents
+            def detect_all(t):
+                readings = np.empty(3*n)
+                for i, body in enumerate(bodies):
+                    readings[3*i:3*i+3] = radar_readings(body)
+                return readings
+            model.stim_radar = nengo.Node(detect_all, size_out=3*n)
+
+            # Node that outputs the pointer corresponding to the color of the cell of every agent
+            color_vectors = {name: color_vocab[name].v for name in color_vocab.keys}
+            def color_all(t):
+                return np.concatenate([color_vectors[color_name(body)] for body in bodies])
+            model.color_input = nengo.Node(color_all, size_out=D*n)
+
+
+        ## CRITTERS ##
+
+        model.critters = []
+        rng = np.random.RandomState(seed)
+        for i in range(n):
+            critter = spa.SPA(label="critter %d" % i)
+            radar, random, false_input, comparison, done = build_critter(
+                critter, model.stim_radar[3*i:3*i+3], model.movement[2*i:2*i+2], fidelity=fidelity,
+                explorer=FrontierExplorer(world, bodies[i]) if exploration else None,
+                n_neurons=n_neurons, radar_neurons=radar_neurons, color_vocab=color_vocab,
+                bool_vocab=bool_vocab, memory_bank=memory_bank, color_gate=color_gate,
+                seed=None if seed is None else rng.randint(2**31))
+            critter.radar = radar
+            critter.done = done
+            nengo.Connection(model.color_input[D*i:D*(i+1)], critter.color_recognizer.input,
+                             synapse=None)
+            model.critters.append(critter)
+
+    return model
+
+
+### MODULE-LEVEL MODEL (for nengo_gui) ###
+
+# Only built when run as a script or by nengo_gui, so that importing this file has no side effects
+if __name__ == "__main__" or "nengo_gui" in sys.modules:
+    world = grid.World(Cell, map=MAP, directions=4)
+    bodies = add_critters(world, N_CRITTERS)
+    model = build_multi_model(world, bodies)
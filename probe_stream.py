@@ -0,0 +1,146 @@
+### IMPORTS ###
+
+import json
+import os
+
+import nengo
+import numpy as np
+
+
+### CONSTANTS ###
+
+CHUNK_SIZE = 1000 # Number of samples kept in memory before they are written to disk
+DTYPE = "float64" # Type of the stored samples
+
+
+### WRITING ###
+
+class ChunkWriter(object):
+    """Appends rows of `columns` values to a raw binary file, one fixed-size chunk at a time.
+
+    The number of columns and the type are stored next to the data in
+    `<path>.json`; the number of rows follows from the size of the file, so
+    a file can be appended to by later runs and read while it is written.
+    """
+
+    def __init__(self, path, columns, chunk_size=CHUNK_SIZE, append=False, dtype=DTYPE):
+        self.path = path
+        self.columns = columns
+        self.buffer = np.zeros((chunk_size, columns), dtype=dtype)
+        self.n_buffered = 0
+        self.file = None
+
+        header = {"columns": columns, "dtype": np.dtype(dtype).str}
+        if append and os.path.exists(path + ".json"):
+            with open(path + ".json") as f:
+                if json.load(f) != header:
+                    raise ValueError("Cannot append to %s: it stores different data" % path)
+        else:
+            with open(path + ".json", "w") as f:
+                json.dump(header, f)
+            open(path, "wb").close()
+
+    def write(self, row):
+        self.buffer[self.n_buffered] = row
+        self.n_buffered += 1
+        if self.n_buffered == len(self.buffer):
+            self.flush()
+
+    # Writes the buffered rows to disk
+    def flush(self):
+        if self.n_buffered == 0:
+            return
+        if self.file is None:
+            self.file = open(self.path, "ab")
+        self.file.write(self.buffer[:self.n_buffered].tobytes())
+        self.file.flush()
+        self.n_buffered = 0
+
+    def close(self):
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class StreamingProbe(nengo.Process):
+    """Process for a node that streams its input to disk instead of keeping it in memory.
+
+    Every `sample_every` seconds (every time step by default) the time and
+    the input are buffered, and the buffer is written to `path` whenever
+    `chunk_size` samples have been collected, so the memory used does not
+    grow with the length of the run. Call `close` (or `flush`) after the run
+    to write the last partial chunk.
+    """
+
+    def __init__(self, path, dimensions, sample_every=None, chunk_size=CHUNK_SIZE, append=False):
+        self.sample_every = sample_every
+        self.writer = ChunkWriter(path, 1 + dimensions, chunk_size=chunk_size, append=append)
+        super(StreamingProbe, self).__init__(default_size_in=dimensions, default_size_out=0)
+
+    def make_step(self, shape_in, shape_out, dt, rng):
+        writer = self.writer
+        every = 1 if self.sample_every is None else max(1, int(round(self.sample_every / dt)))
+        row = np.zeros(writer.columns)
+        steps = [0]
+
+        def step(t, x):
+            steps[0] += 1
+            if steps[0] % every == 0:
+                row[0] = t
+                row[1:] = x
+                writer.write(row)
+        return step
+
+    def flush(self):
+        self.writer.flush()
+
+    def close(self):
+        self.writer.close()
+
+
+def add_stream(model, obj, path, synapse=None, sample_every=None, chunk_size=CHUNK_SIZE,
+               append=False, label=None):
+    """Streams the output of `obj` (optionally filtered by `synapse`) to `path`; returns the StreamingProbe."""
+    with model:
+        stream = StreamingProbe(path, obj.size_out, sample_every=sample_every,
+                                chunk_size=chunk_size, append=append)
+        node = nengo.Node(stream, size_in=obj.size_out, label=label)
+        nengo.Connection(obj, node, synapse=synapse)
+    return stream
+
+def add_critter_streams(model, body, directory, synapse=0.01, **kwargs):
+    """Streams the color memories, comparison, done and pose of a critter built with `build_model`.
+
+    Every signal is written to `<directory>/<name>.dat`; further keyword
+    arguments are passed to `add_stream`. Returns the streams by name.
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    with model:
+        pose = nengo.Node(lambda t: [body.x, body.y, body.dir], label="pose")
+    signals = dict(("%s_memory" % color.lower(), output)
+                   for color, output in model.memory_outputs.items())
+    signals.update(comparison=model.comparison.output, done=model.done, pose=pose)
+    return dict((name, add_stream(model, obj, os.path.join(directory, name + ".dat"),
+                                  synapse=None if name == "pose" else synapse, label=name, **kwargs))
+                for name, obj in signals.items())
+
+# Writes the last samples of all streams (a list, or a dict as returned by add_critter_streams) to disk
+def close_streams(streams):
+    for stream in (streams.values() if isinstance(streams, dict) else streams):
+        stream.close()
+
+
+### READING ###
+
+def load_stream(path):
+    """Returns the times and values stored at `path`, memory-mapped (read lazily from disk)."""
+    with open(path + ".json") as f:
+        header = json.load(f)
+    dtype = np.dtype(header["dtype"])
+    rows = os.path.getsize(path) // (dtype.itemsize * header["columns"])
+    if rows == 0:
+        return np.zeros(0, dtype=dtype), np.zeros((0, header["columns"] - 1), dtype=dtype)
+    data = np.memmap(path, dtype=dtype, mode="r", shape=(rows, header["columns"]))
+    return data[:, 0], data[:, 1:]
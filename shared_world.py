@@ -0,0 +1,162 @@
+### IMPORTS ###
+
+from multiprocessing import shared_memory
+
+import grid
+import numpy as np
+
+from lidar import map_arrays
+
+
+### CONSTANTS ###
+
+ARRAYS = ("walls", "colors", "neighbours") # Arrays of a SharedMap, in the order they are stored
+TILE_SIZE = 16 # Side of the tiles in which a SharedWorld creates its cells
+
+
+### SHARED MAP ###
+
+class SharedMap(object):
+    """Wall mask, color codes and neighbour table of a map, placed once in shared memory.
+
+    The process that loads the map creates it with `SharedMap.create(world)`
+    and passes `spec` (a small picklable dict) to its workers, which attach
+    to the same memory with `SharedMap(spec)` (or `attach_map`) instead of
+    parsing the map again. `walls` and `colors` are the (height, width)
+    arrays of `map_arrays`; `neighbours[y * width + x, dir]` is the flat
+    index of the neighbour of (x, y) in direction dir. All arrays are
+    read-only. Every process calls `close` when it is done; the creator also
+    calls `unlink` to free the memory.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.width = spec["width"]
+        self.height = spec["height"]
+        self.directions = spec["directions"]
+        self.blocks = []
+        for name in ARRAYS:
+            block_name, shape, dtype = spec[name]
+            block = shared_memory.SharedMemory(name=block_name)
+            array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            array.flags.writeable = False
+            self.blocks.append(block)
+            setattr(self, name, array)
+
+    @classmethod
+    def create(cls, world):
+        """Copies the map of `world` into new shared memory blocks; returns the SharedMap."""
+        walls, colors = map_arrays(world)
+        x, y = np.meshgrid(np.arange(world.width), np.arange(world.height))
+        neighbours_x, neighbours_y = world.get_neighbour_points(x, y)
+        neighbours = (neighbours_y * world.width + neighbours_x).reshape(-1, world.directions)
+        arrays = {"walls": walls, "colors": colors.astype(np.int32),
+                  "neighbours": neighbours.astype(np.int32)}
+
+        spec = {"width": world.width, "height": world.height, "directions": world.directions}
+        blocks = []
+        for name in ARRAYS:
+            array = arrays[name]
+            block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            spec[name] = (block.name, array.shape, array.dtype.str)
+            blocks.append(block)
+        shared = cls(spec)
+        # The blocks stay open in the creator until `close`, so they cannot disappear early
+        shared.created = blocks
+        return shared
+
+    # Detaches this process from the shared memory (the arrays are no longer usable afterwards)
+    def close(self):
+        for name in ARRAYS:
+            setattr(self, name, None)
+        for block in self.blocks + getattr(self, "created", []):
+            block.close()
+        self.blocks = []
+
+    # Frees the shared memory (by the creator, once all workers are done)
+    def unlink(self):
+        for block in getattr(self, "created", []):
+            block.unlink()
+        self.created = []
+
+
+# SharedMaps this process is attached to, by the name of their wall mask
+attached_maps = {}
+
+def attach_map(spec):
+    """Returns the SharedMap for `spec`, attaching only once per process."""
+    name = spec["walls"][0]
+    if name not in attached_maps:
+        attached_maps[name] = SharedMap(spec)
+    return attached_maps[name]
+
+
+### SHARED WORLD ###
+
+class SharedWorld(grid.TiledWorld):
+    """World that reads its map from a SharedMap instead of holding its own copy.
+
+    Cells are created one tile at a time on first access (as in TiledWorld),
+    with `wall` and `cellcolor` taken from the shared arrays, and neighbours
+    are looked up in the shared neighbour table, so a worker only holds its
+    agents and the cells around them. The color index is built from the
+    shared arrays. Changing a cell only changes the private copy of this
+    process. Iterating the cells (e.g. for rendering) creates the tiles that
+    contain walls or colors.
+    """
+
+    def __init__(self, shared_map, cell=None, tile_size=TILE_SIZE):
+        self.shared = shared_map
+        grid.TiledWorld.__init__(self, cell, width=shared_map.width, height=shared_map.height,
+                                 directions=shared_map.directions, tile_size=tile_size)
+        points = np.nonzero(shared_map.walls | (shared_map.colors != 0))
+        self.content_tiles = sorted(set(zip((points[1] // tile_size).tolist(),
+                                            (points[0] // tile_size).tolist())))
+
+    def init_tile(self, tile):
+        walls, colors = self.shared.walls, self.shared.colors
+        for row in tile:
+            for cell in row:
+                cell.wall = bool(walls[cell.y, cell.x])
+                cell.cellcolor = int(colors[cell.y, cell.x])
+
+    def load(self, filename=None, map=None):
+        raise grid.CellularException('The map of a SharedWorld is read-only')
+
+    def get_point_in_direction(self, x, y, dir):
+        n = int(self.shared.neighbours[y * self.width + x, dir])
+        return (n % self.width, n // self.width)
+
+    def iter_cells(self):
+        for tx, ty in self.content_tiles:
+            self.get_tile(tx, ty)
+        return grid.TiledWorld.iter_cells(self)
+
+    # Index of the colors and walls of the shared map, then of the cells changed by this process
+    def build_index(self):
+        self.color_index = {}
+        self.wall_index = set()
+        self._indexed_colors = {}
+        walls, colors = self.shared.walls, self.shared.colors
+        ys, xs = np.nonzero(walls)
+        self.wall_index.update(zip(xs.tolist(), ys.tolist()))
+        for code in np.unique(colors[~walls]).tolist():
+            color = self.code_color(code)
+            if color is not None:
+                ys, xs = np.nonzero((colors == code) & ~walls)
+                points = set(zip(xs.tolist(), ys.tolist()))
+                self.color_index[color] = points
+                self._indexed_colors.update(dict.fromkeys(points, color))
+        for cell in grid.TiledWorld.iter_cells(self):
+            self.cell_changed(cell)
+
+    # Color (as returned by Cell.color) of a free cell with color code `code`
+    def code_color(self, code):
+        cell = self.Cell()
+        cell.wall = False
+        cell.cellcolor = code
+        try:
+            return cell.color()
+        except AttributeError:
+            return None
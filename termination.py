@@ -0,0 +1,96 @@
+### IMPORTS ###
+
+import nengo
+
+from colour_critter import COLORS, STOP_SIM_THRESHOLD, bool_vocab
+
+
+### CONSTANTS ###
+
+HOLD_TIME = 0.1 # Time the done signal has to stay above the threshold before the critter counts as done (in seconds)
+SEEN_THRESHOLD = 0.5 # Similarity with TRUE above which a color memory counts as seen
+
+
+### TERMINATION ###
+
+class CritterDone(Exception):
+    """Raised by a TerminationNode to stop `Simulator.run` once the critter is done."""
+    pass
+
+
+class TerminationNode(nengo.Node):
+    """Node that watches the (filtered) done signal of a critter.
+
+    Its input is the done value followed by the similarity of every color
+    memory with TRUE. Once the done value stays above `threshold` for
+    `hold_time` seconds, the critter counts as done: `completion_time` is the
+    time at which the done value crossed the threshold (the start of the
+    hold), `confirmed_time` the time at which the hold elapsed, and
+    `colors_seen` the colors seen by then. If `stop` is set, CritterDone is
+    then raised to end the running simulation.
+    """
+
+    def __init__(self, colors=COLORS, threshold=STOP_SIM_THRESHOLD, hold_time=HOLD_TIME,
+                 stop=True, label="termination"):
+        self.colors = list(colors)
+        self.threshold = threshold
+        self.hold_time = hold_time
+        self.stop = stop
+        self.reset()
+
+        def check(t, x):
+            if self.completion_time is not None:
+                return
+            if x[0] <= self.threshold:
+                self.above_since = None
+                return
+            if self.above_since is None:
+                self.above_since = t
+            if t - self.above_since >= self.hold_time:
+                self.completion_time = self.above_since
+                self.confirmed_time = t
+                self.colors_seen = [color for color, similarity in zip(self.colors, x[1:])
+                                    if similarity > SEEN_THRESHOLD]
+                if self.stop:
+                    raise CritterDone("Critter done at t=%.3f" % t)
+
+        super(TerminationNode, self).__init__(check, size_in=1 + len(self.colors),
+                                              size_out=0, label=label)
+
+    # Forgets a recorded completion (e.g. after resetting the simulator)
+    def reset(self):
+        self.above_since = None
+        self.completion_time = None
+        self.confirmed_time = None
+        self.colors_seen = None
+
+
+def add_termination(model, done, memory_outputs, colors=COLORS, vocab=bool_vocab, synapse=0.03,
+                    **kwargs):
+    """Adds a TerminationNode to `model` that watches `done` and the color memories.
+
+    `memory_outputs` maps every color to the output of its memory (see
+    `model.memory_outputs` of a critter built with `build_critter`) and `vocab`
+    is the boolean vocabulary of the critter. Further keyword arguments are
+    passed to TerminationNode.
+    """
+    with model:
+        node = TerminationNode(colors, **kwargs)
+        nengo.Connection(done, node[0], synapse=synapse)
+        for i, color in enumerate(colors):
+            nengo.Connection(memory_outputs[color], node[1 + i],
+                             transform=[vocab["TRUE"].v], synapse=synapse)
+    return node
+
+
+def run_until_done(sim, node, max_time):
+    """Runs `sim` for at most `max_time` seconds, stopping early when `node` reports the critter done.
+
+    Returns the completion time, at which the critter reached done (None if
+    it was not done in time); the simulation itself ends `hold_time` later.
+    """
+    try:
+        sim.run(max_time, progress_bar=False)
+    except CritterDone:
+        pass
+    return node.completion_time
@@ -0,0 +1,186 @@
+### IMPORTS ###
+
+import argparse
+import multiprocessing
+import time
+
+import grid
+import nengo
+import numpy as np
+
+from colour_critter import (Cell, MAP, COLORS_TO_FIND, D, N_NEURONS, EXPLORATION, DEFAULT_CONFIG,
+                            make_vocabs, color_name)
+from multi_critter import add_critters, build_multi_model
+from shared_world import SharedMap, SharedWorld, attach_map
+from termination import add_termination, run_until_done
+
+
+### CONSTANTS ###
+
+START = DEFAULT_CONFIG["start"] # Start position and direction of the agent
+SEEDS = 5 # Number of seeds every setting is run with
+MAX_TIME = 30.0 # Longest simulated time per run (in seconds)
+GRACE_TIME = 1.0 # Time the critter gets to stop after it has visited enough colors (in seconds)
+TARGET_RATE = 0.2 # Largest acceptable false-stop and missed-stop rate
+
+BASELINE = (D, N_NEURONS, N_NEURONS*10) # (D, N_NEURONS, radar neurons) of colour_critter.py
+
+
+### RUNNING THE CRITTER ###
+
+def run_critter(args):
+    """Runs the critter with one (D, N_NEURONS, radar neurons) setting and seed.
+
+    Returns whether it stopped too early (before actually visiting
+    COLORS_TO_FIND colors) or missed its stop (visited them, but did not stop
+    within GRACE_TIME), together with its neuron count and speed. With the
+    spec of a SharedMap, the world reads the map from shared memory instead
+    of parsing MAP.
+    """
+    setting, seed, max_time, exploration, shared_map = args
+    dimensions, n_neurons, radar_neurons = setting
+    color_vocab, bool_vocab = make_vocabs(dimensions, rng=np.random.RandomState(seed))
+
+    if shared_map is None:
+        world = grid.World(Cell, map=MAP, directions=4)
+    else:
+        world = SharedWorld(attach_map(shared_map), Cell)
+    body = add_critters(world, 1, positions=[START])[0]
+    model = build_multi_model(world, [body], exploration=exploration, n_neurons=n_neurons,
+                              radar_neurons=radar_neurons, color_vocab=color_vocab,
+                              bool_vocab=bool_vocab, render=False, seed=seed)
+    critter = model.critters[0]
+    termination = add_termination(model, critter.done, critter.memory_outputs, vocab=bool_vocab)
+
+    # Record when the agent actually visits every color
+    visited = {}
+    def track(t):
+        color = color_name(body)
+        if t > 0 and color != "NONE" and color not in visited:
+            visited[color] = t
+    with model:
+        nengo.Node(track, size_out=0)
+
+    with nengo.Simulator(model, seed=seed, progress_bar=False) as sim:
+        start = time.time()
+        stop_time = run_until_done(sim, termination, max_time)
+        run_time = time.time() - start
+        sim_time = sim.time
+
+    times = sorted(visited.values())
+    found_time = times[COLORS_TO_FIND - 1] if len(times) >= COLORS_TO_FIND else None
+    return {
+        "false_stop": stop_time is not None and (found_time is None or stop_time < found_time),
+        "missed_stop": found_time is not None and (
+            stop_time > found_time + GRACE_TIME if stop_time is not None
+            else found_time + GRACE_TIME < sim_time),
+        "neurons": sum(ens.n_neurons for ens in critter.all_ensembles),
+        "speed": sim_time / run_time,
+    }
+
+
+### SEARCH ###
+
+class Tuner(object):
+    """Searches the cheapest setting whose false-stop and missed-stop rates stay under a target.
+
+    Every parameter is bisected in turn over its candidate values (keeping the
+    others at their current best), assuming that a setting that works keeps
+    working with more resources. Every setting is evaluated once, on all seeds.
+    """
+
+    def __init__(self, pool, seeds=SEEDS, max_time=MAX_TIME, target_rate=TARGET_RATE,
+                 exploration=EXPLORATION, shared_map=None):
+        self.pool = pool
+        self.shared_map = shared_map
+        self.seeds = seeds
+        self.max_time = max_time
+        self.target_rate = target_rate
+        self.exploration = exploration
+        self.results = {}
+
+    def evaluate(self, setting):
+        if setting not in self.results:
+            runs = self.pool.map(run_critter, [(setting, seed, self.max_time, self.exploration,
+                                                self.shared_map) for seed in range(self.seeds)])
+            self.results[setting] = {
+                "false_rate": np.mean([run["false_stop"] for run in runs]),
+                "missed_rate": np.mean([run["missed_stop"] for run in runs]),
+                "neurons": runs[0]["neurons"],
+                "speed": np.mean([run["speed"] for run in runs]),
+            }
+        return self.results[setting]
+
+    def passes(self, setting):
+        result = self.evaluate(setting)
+        return (result["false_rate"] <= self.target_rate
+                and result["missed_rate"] <= self.target_rate)
+
+    # Smallest candidate for parameter `index` that passes (None if even the largest fails)
+    def bisect(self, setting, index, candidates):
+        def with_value(value):
+            return setting[:index] + (value,) + setting[index + 1:]
+        candidates = sorted(candidates)
+        if not self.passes(with_value(candidates[-1])):
+            return None
+        lo, hi = 0, len(candidates) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.passes(with_value(candidates[mid])):
+                hi = mid
+            else:
+                lo = mid + 1
+        return candidates[lo]
+
+    def tune(self, candidates, start=BASELINE):
+        """Returns the tuned setting, starting from `start` and bisecting every parameter in turn."""
+        setting = start
+        for index, values in enumerate(candidates):
+            best = self.bisect(setting, index, values)
+            if best is not None:
+                setting = setting[:index] + (best,) + setting[index + 1:]
+        return setting
+
+
+def report(tuner, baseline, tuned):
+    print("%4s %9s %7s %8s %8s %8s %9s" % ("D", "N_NEURONS", "radar", "neurons", "false",
+                                          "missed", "sim/wall"))
+    for setting, result in sorted(tuner.results.items(), key=lambda item: item[1]["neurons"]):
+        print("%4d %9d %7d %8d %8.2f %8.2f %9.3f" % (setting + (
+            result["neurons"], result["false_rate"], result["missed_rate"], result["speed"])))
+
+    base, best = tuner.results[baseline], tuner.results[tuned]
+    print("")
+    print("Tuned config: D = %d, N_NEURONS = %d, radar neurons = %d" % tuned)
+    print("Neurons: %d -> %d (%.1fx fewer), speedup: %.2fx" % (
+        base["neurons"], best["neurons"], base["neurons"] / float(best["neurons"]),
+        best["speed"] / base["speed"]))
+
+
+### MAIN ###
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find the smallest neuron budget for the critter.")
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[16, 32])
+    parser.add_argument("--neurons", type=int, nargs="+", default=[10, 20, 30, 40, 50])
+    parser.add_argument("--radar-neurons", type=int, nargs="+", default=[50, 100, 200, 300, 500])
+    parser.add_argument("--seeds", type=int, default=SEEDS)
+    parser.add_argument("--max-time", type=float, default=MAX_TIME)
+    parser.add_argument("--target-rate", type=float, default=TARGET_RATE)
+    parser.add_argument("--explore", action="store_true", default=EXPLORATION,
+                        help="use the frontier exploration controller (shorter runs)")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    # The map is loaded once and shared with all workers
+    shared_map = SharedMap.create(grid.World(Cell, map=MAP, directions=4))
+    pool = multiprocessing.Pool(args.processes)
+    tuner = Tuner(pool, seeds=args.seeds, max_time=args.max_time, target_rate=args.target_rate,
+                  exploration=args.explore, shared_map=shared_map.spec)
+    tuner.evaluate(BASELINE)
+    tuned = tuner.tune([args.dimensions, args.neurons, args.radar_neurons])
+    pool.close()
+    pool.join()
+    shared_map.close()
+    shared_map.unlink()
+    report(tuner, BASELINE, tuned)